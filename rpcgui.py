@@ -6,6 +6,7 @@ import time
 from pathlib import Path
 
 import sentry_sdk
+from PyQt5 import QtCore as Qc
 from PyQt5 import QtGui as Qg
 from PyQt5 import QtWidgets as Qw
 
@@ -57,6 +58,13 @@ class SystemTrayIcon(Qw.QSystemTrayIcon):
         super().__init__(parent)
         self.parent = parent
 
+        # loaded once, we switch between these a lot
+        self.icons = {
+            'active': Qg.QIcon(str(script_dir / 'icons' / 'active.png')),
+            'inactive': Qg.QIcon(str(script_dir / 'icons' / 'inactive.png')),
+            'disabled': Qg.QIcon(str(script_dir / 'icons' / 'disabled.png'))
+        }
+
         self.update()
 
         self.quit_button = None
@@ -78,6 +86,7 @@ class SystemTrayIcon(Qw.QSystemTrayIcon):
         else:
             self.parent.wiimmfi_thread.run = True
             self.toggle_button.setText('Disable game detection')
+        self.parent.wiimmfi_thread.wake_event.set()
 
         self.update()
 
@@ -115,16 +124,22 @@ class SystemTrayIcon(Qw.QSystemTrayIcon):
         online_player = self.parent.wiimmfi_thread.last_player
 
         if not self.parent.wiimmfi_thread.run:
-            icon_path = script_dir / 'icons' / 'disabled.png'
+            icon = self.icons['disabled']
             self.setToolTip('Game detection has been disabled.')
+        elif self.parent.discord_thread.available is False:
+            # whatever we detect, nobody gets to see it
+            icon = self.icons['inactive']
+            if online_player:
+                self.setToolTip(f'Playing {online_player.game_name}, but Discord is not running.')
+            else:
+                self.setToolTip('Discord is not running.')
         elif online_player:
-            icon_path = script_dir / 'icons' / 'active.png'
+            icon = self.icons['active']
             self.setToolTip(f'Playing {online_player.game_name}.')
         else:
-            icon_path = script_dir / 'icons' / 'inactive.png'
+            icon = self.icons['inactive']
             self.setToolTip('Not playing any games.')
 
-        icon = Qg.QIcon(str(icon_path))
         self.setIcon(icon)
 
 
@@ -165,7 +180,8 @@ class TableWidget(Qw.QWidget):
 
             params = {
                 'config': self.config,
-                'gui_handler': gui_handler
+                'gui_handler': gui_handler,
+                'history': self.parent.history
             }
 
             # initialize widget and add it to our tabs
@@ -212,14 +228,28 @@ class Application(Qw.QMainWindow):
 
         self.config = self.load_config()
         logging.info('Loaded config files')
+
+        if self.config.preferences['debug']:
+            # the file handler takes everything, the GUI handler stays at INFO
+            logger.setLevel(logging.DEBUG)
         version = self.config.version_info['version']
 
         self._init_sentry()
 
-        self.wiimmfi_thread = util.WiimmfiCheckThread(self.config, self._status_updated)
+        # connects in the background, we don't want to wait on Discord here
+        self.discord_thread = util.DiscordPresenceThread(self.config)
+        self.discord_thread.availability_changed.connect(self._discord_availability_changed, Qc.Qt.QueuedConnection)
+        self.thread_manager.add_thread(self.discord_thread)
+
+        self.history = util.HistoryStore(data_dir / 'history.sqlite3')
+        self.thread_manager.add_thread(self.history.writer)
+
+        self.wiimmfi_thread = util.WiimmfiCheckThread(self.config, self.discord_thread, self.history)
+        # status changes come from the worker thread, the tray has to be updated on ours
+        self.wiimmfi_thread.status_changed.connect(self._status_updated, Qc.Qt.QueuedConnection)
         self.thread_manager.add_thread(self.wiimmfi_thread)
 
-        self.game_list_thread = util.WiimmfiGameListThread()
+        self.game_list_thread = util.WiimmfiGameListThread(self.config)
         self.thread_manager.add_thread(self.game_list_thread)
 
         self.updater = util.Updater(self.thread_manager, self.config)
@@ -237,6 +267,9 @@ class Application(Qw.QMainWindow):
         # access to all the resources it needs.
         self.sys_tray = SystemTrayIcon(self)
         self.sys_tray.show()
+        if self.discord_thread.available is False:
+            # we couldn't tell the tray before it existed
+            self._discord_availability_changed(False)
 
         self.show()
 
@@ -262,25 +295,38 @@ class Application(Qw.QMainWindow):
         if new_registered:
             sentry_sdk.capture_message('newClient')
 
-    def _status_updated(self):
+    def _status_updated(self, status=None):
         if self.sys_tray is None:  # not yet initialized, we drop the update to prevent a race condition.
             return
         self.sys_tray.update()
 
+    def _discord_availability_changed(self, available):
+        if self.sys_tray is None:
+            return
+
+        self.sys_tray.update()
+        if not available:
+            self.sys_tray.showMessage('Wiimmfi-RPC', 'Could not reach Discord, your game status will not be shown '
+                                                     'until it is running.', Qw.QSystemTrayIcon.Warning)
+
     def closeEvent(self, event: Qg.QCloseEvent):
         self.setHidden(True)
 
         # save all config files, in case something was pending
         self.config.friend_codes.flush()
         self.config.preferences.flush()
+        util.http_session.cache.flush()
 
         if not self.config.preferences['config']['tray']['minimize_on_exit']:
+            self.history.flush()
             event.accept()
             return
 
         if self.do_close:
             ok = util.MsgBoxes.promptyesno('Are you sure you want to quit?')
             if ok:
+                # only on a real exit, minimizing to the tray shouldn't wait on the writer
+                self.history.flush()
                 event.accept()
         else:
             event.ignore()
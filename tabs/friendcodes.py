@@ -1,14 +1,18 @@
 import json
 import logging
 import sys
+import time
 from pathlib import Path
 
 from PyQt5 import QtCore as Qc
 from PyQt5 import QtWidgets as Qw
 
+from util.config import FriendCode
+
 logging.getLogger(__name__)
 
 cache_path = Path(sys.argv[0]).parent / 'data' / 'cache'
+played_period = 7 * 24 * 60 * 60  # seconds of history summed up in the Played column
 
 
 class EditPopup(Qw.QWidget):
@@ -104,6 +108,9 @@ class EditPopup(Qw.QWidget):
         if priority == '':
             priority = 0
 
+        if console == 'NDS':  # stored as NDS, shown as DS
+            console = 'DS'
+
         index = self.console.findText(console)
         self.console.setCurrentIndex(index)
         self.game_id.setText(game_id)
@@ -146,6 +153,7 @@ class FriendcodesTab(Qw.QWidget):
         self.parent = parent
 
         self.config = params.get('config')
+        self.history = params.get('history')
 
         self.button_layout = self.create_buttons()
 
@@ -194,8 +202,8 @@ class FriendcodesTab(Qw.QWidget):
 
     def create_tree(self):
         tree = Qw.QTreeWidget()
-        tree.setColumnCount(4)
-        tree.setHeaderLabels(['Console', 'Game', 'Friend Code', 'Priority'])
+        tree.setColumnCount(6)
+        tree.setHeaderLabels(['Console', 'Game', 'Friend Code', 'Priority', 'Last Seen', 'Played (7d)'])
 
         tree.addTopLevelItems(self.CATEGORIES.values())
 
@@ -210,25 +218,29 @@ class FriendcodesTab(Qw.QWidget):
 
         codes = self.config.friend_codes
 
-        for entry in codes:
-            console = entry.get('console')
-            game_id = entry.get('game_id')
-            friend_code = entry.get('friend_code')
-            priority = entry.get('priority')
-
-            if console == 'DS':  # backwards compat
-                console = 'NDS'
+        # all from the local history, one query each
+        last_seen = self.history.last_seen_all()
+        online = self.history.online()
+        played = self.history.session_durations(since=time.time() - played_period)
 
-            category = self.CATEGORIES.get(console)
+        for code in codes:
+            category = self.CATEGORIES.get(code.console)
             if not category:
-                logging.warning(f'Invalid console found in friend code entry: {console}')
+                logging.warning(f'Invalid console found in friend code entry: {code.console}')
                 continue
 
-            if not (console or game_id or friend_code or priority or category):
-                logging.warning(f'Detected invalid friend code entry: {game_id}')
-                continue
+            if code.key in online:
+                seen_text = 'Online'
+            elif code.key in last_seen:
+                seen_text = time.strftime('%Y-%m-%d %H:%M', time.localtime(last_seen[code.key]))
+            else:
+                seen_text = 'Never'
+
+            minutes = int(played.get(code.key, 0) // 60)
+            played_text = f'{minutes // 60}h {minutes % 60:02}m'
 
-            item = Qw.QTreeWidgetItem([console, game_id, friend_code, priority])
+            item = Qw.QTreeWidgetItem([code.console, code.game_id, code.friend_code, str(code.priority),
+                                       seen_text, played_text])
             category.addChild(item)
 
     def launch_popup(self, modify):
@@ -256,37 +268,21 @@ class FriendcodesTab(Qw.QWidget):
         self.popup = EditPopup(self.edit_code, replace_item=replace_item, **values)
 
     def edit_code(self, delete_item=None, **payload):
-        console = payload.get('console')
-        game_id = payload.get('game_id')
-        friend_code = payload.get('friend_code')
-        priority = payload.get('priority')
-
-        category = self.CATEGORIES.get(console)
-
-        self.config.friend_codes.append(payload)
+        try:
+            code = FriendCode(**payload)
+        except ValueError:
+            logging.warning(f'Invalid priority for friend code entry: {payload.get("priority")}')
+            return
 
         if delete_item is not None:
-            old_console = delete_item.text(0)
-            old_game_id = delete_item.text(1)
-            old_friend_code = delete_item.text(2)
-            old_priority = delete_item.text(3)
-
-            delete_item.setText(0, console)
-            delete_item.setText(1, game_id)
-            delete_item.setText(2, friend_code)
-            delete_item.setText(3, priority)
-
-            old_config_item = {
-                'console': old_console,
-                'game_id': old_game_id,
-                'friend_code': old_friend_code,
-                'priority': old_priority
-            }
-
-            self.config.friend_codes.remove(old_config_item)
+            old_code = FriendCode(delete_item.text(0), delete_item.text(1),
+                                  delete_item.text(2), delete_item.text(3))
+            self.config.friend_codes.update(old_code, code)
         else:
-            item = Qw.QTreeWidgetItem([console, game_id, friend_code, priority])
-            category.addChild(item)
+            self.config.friend_codes.add(code)
+
+        # codes with the same game and friend code replace each other, so rebuild the tree
+        self.populate_tree()
 
     def remove_code(self):
         item = self.tree.currentItem()
@@ -297,16 +293,6 @@ class FriendcodesTab(Qw.QWidget):
         console = item.text(0)
         game_id = item.text(1)
         friend_code = item.text(2)
-        priority = item.text(3)
-
-        category = self.CATEGORIES.get(console)
-
-        config_item = {
-            'console': console,
-            'game_id': game_id,
-            'friend_code': friend_code,
-            'priority': priority
-        }
 
-        category.removeChild(item)
-        self.config.friend_codes.remove(config_item)
+        item.parent().removeChild(item)
+        self.config.friend_codes.remove(FriendCode(console, game_id, friend_code))
@@ -1,5 +1,134 @@
+import logging
+import time
+
+from PyQt5 import QtCore as Qc
+from PyQt5 import QtGui as Qg
 from PyQt5 import QtWidgets as Qw
 
+refresh_interval = 250  # milliseconds between checks for new records
+
+
+class LogListModel(Qc.QAbstractListModel):
+    """
+    List model over a LogRecordStore, showing only the records that match the current filter.
+
+    Rows are just sequence numbers into the store, so the view only ever
+    renders what's visible. New records are filtered as they come in;
+    the full history is only queried again when a filter gets wider.
+    """
+
+    LEVEL_COLORS = {
+        logging.WARNING: Qg.QColor('darkorange'),
+        logging.ERROR: Qg.QColor('red'),
+        logging.CRITICAL: Qg.QColor('darkred')
+    }
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+
+        self.store = store
+
+        self.min_level = None
+        self.thread_name = None
+        self.max_age = None
+        self.text = ''
+
+        self._rows = []
+        self._next_seq = self.store.first_seq
+
+        self.requery()
+
+    def rowCount(self, parent=Qc.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def data(self, index, role=Qc.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        entry = self.store.get(self._rows[index.row()])
+        if entry is None:  # dropped from the store, will be removed on the next refresh
+            return None
+
+        if role == Qc.Qt.DisplayRole:
+            return entry.text
+        elif role == Qc.Qt.ForegroundRole:
+            return self.LEVEL_COLORS.get(entry.levelno)
+
+        return None
+
+    def _query(self, start=None):
+        since = time.time() - self.max_age if self.max_age is not None else None
+        return self.store.query(min_level=self.min_level, thread_name=self.thread_name,
+                                since=since, text=self.text, start=start)
+
+    def requery(self):
+        """Rebuilds the rows from the store's indexes."""
+        self.beginResetModel()
+        self._next_seq = self.store.next_seq
+        self._rows = self._query()
+        self.endResetModel()
+
+    def set_filter(self, min_level=None, thread_name=None, max_age=None, text=''):
+        narrowing = (min_level == self.min_level
+                     and thread_name == self.thread_name
+                     and max_age == self.max_age
+                     and self.text.lower() in text.lower())
+
+        self.min_level = min_level
+        self.thread_name = thread_name
+        self.max_age = max_age
+        self.text = text
+
+        if not narrowing:
+            self.requery()
+            return
+
+        # a longer search text can only remove rows, no need to go through the whole store
+        search = text.lower()
+        rows = []
+        for seq in self._rows:
+            entry = self.store.get(seq)
+            if entry is not None and search in entry.text.lower():
+                rows.append(seq)
+
+        self.beginResetModel()
+        self._rows = rows
+        self.endResetModel()
+
+    def refresh(self):
+        """Drops rows that left the store or the time window, and appends matching new records."""
+        cutoff = self.store.first_seq
+        dropped = 0
+        while dropped < len(self._rows) and self._rows[dropped] < cutoff:
+            dropped += 1
+
+        if self.max_age is not None:
+            since = time.time() - self.max_age
+            while dropped < len(self._rows):
+                entry = self.store.get(self._rows[dropped])
+                if entry is not None and entry.created >= since:
+                    break
+                dropped += 1
+
+        if dropped:
+            self.beginRemoveRows(Qc.QModelIndex(), 0, dropped - 1)
+            del self._rows[:dropped]
+            self.endRemoveRows()
+
+        if self.store.next_seq == self._next_seq:
+            return
+
+        new_rows = self._query(start=self._next_seq)
+        self._next_seq = self.store.next_seq
+        if not new_rows:
+            return
+
+        self.beginInsertRows(Qc.QModelIndex(), len(self._rows), len(self._rows) + len(new_rows) - 1)
+        self._rows += new_rows
+        self.endInsertRows()
+
 
 class LogsTab(Qw.QWidget):
     OPTIONS = {
@@ -7,6 +136,22 @@ class LogsTab(Qw.QWidget):
         'debug': True
     }
 
+    LEVELS = {
+        'All levels': None,
+        'Debug': logging.DEBUG,
+        'Info': logging.INFO,
+        'Warning': logging.WARNING,
+        'Error': logging.ERROR,
+        'Critical': logging.CRITICAL
+    }
+    AGES = {
+        'All time': None,
+        'Last 5 minutes': 5 * 60,
+        'Last hour': 60 * 60,
+        'Last day': 24 * 60 * 60
+    }
+    ALL_THREADS = 'All threads'
+
     def __init__(self, parent, **params):
         super().__init__()
 
@@ -15,11 +160,76 @@ class LogsTab(Qw.QWidget):
         self.config = params.get('config')
         self.handler = params.get('gui_handler')
 
-        self.layout = Qw.QVBoxLayout()
+        self.model = LogListModel(self.handler.store, self)
 
-        self.log_widget = Qw.QPlainTextEdit(self)
-        self.log_widget.setReadOnly(True)
-        self.handler.widget = self.log_widget
+        self.header = self.create_header()
 
-        self.layout.addWidget(self.log_widget)
+        self.log_view = Qw.QListView(self)
+        self.log_view.setModel(self.model)
+        self.log_view.setUniformItemSizes(True)
+        self.log_view.setEditTriggers(Qw.QAbstractItemView.NoEditTriggers)
+        self.log_view.setSelectionMode(Qw.QAbstractItemView.ExtendedSelection)
+        self.log_view.setFont(Qg.QFontDatabase.systemFont(Qg.QFontDatabase.FixedFont))
+        self.log_view.scrollToBottom()
+
+        self.layout = Qw.QVBoxLayout()
+        self.layout.addLayout(self.header)
+        self.layout.addWidget(self.log_view)
         self.setLayout(self.layout)
+
+        self.timer = Qc.QTimer(self)
+        self.timer.setInterval(refresh_interval)
+        self.timer.timeout.connect(self._refresh)
+        self.timer.start()
+
+    def _refresh(self):
+        scrollbar = self.log_view.verticalScrollBar()
+        at_bottom = scrollbar.value() == scrollbar.maximum()
+
+        self.model.refresh()
+        self._update_threads()
+
+        if at_bottom:
+            self.log_view.scrollToBottom()
+
+    def _update_threads(self):
+        known = {self.thread_filter.itemText(i) for i in range(1, self.thread_filter.count())}
+        for name in self.handler.store.thread_names():
+            if name not in known:
+                self.thread_filter.addItem(name)
+
+    def _apply_filter(self):
+        thread_name = self.thread_filter.currentText()
+        if thread_name == self.ALL_THREADS:
+            thread_name = None
+
+        self.model.set_filter(min_level=self.LEVELS.get(self.level_filter.currentText()),
+                              thread_name=thread_name,
+                              max_age=self.AGES.get(self.age_filter.currentText()),
+                              text=self.search_field.text())
+
+    def create_header(self):
+        self.level_filter = Qw.QComboBox()
+        self.level_filter.addItems(self.LEVELS.keys())
+        self.level_filter.currentTextChanged.connect(self._apply_filter)
+
+        self.thread_filter = Qw.QComboBox()
+        self.thread_filter.addItem(self.ALL_THREADS)
+        self.thread_filter.currentTextChanged.connect(self._apply_filter)
+
+        self.age_filter = Qw.QComboBox()
+        self.age_filter.addItems(self.AGES.keys())
+        self.age_filter.currentTextChanged.connect(self._apply_filter)
+
+        self.search_field = Qw.QLineEdit()
+        self.search_field.setPlaceholderText('Search...')
+        self.search_field.textChanged.connect(self._apply_filter)
+
+        layout = Qw.QHBoxLayout()
+        layout.addWidget(self.level_filter)
+        layout.addWidget(self.thread_filter)
+        layout.addWidget(self.age_filter)
+        layout.addStretch()
+        layout.addWidget(self.search_field)
+
+        return layout
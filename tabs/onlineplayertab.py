@@ -1,5 +1,9 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from PyQt5 import QtWidgets as Qw
 
+from util.config import FriendCode
 from util.threading import Thread
 
 
@@ -10,33 +14,53 @@ class WiimmfiOnlinePlayerFetchThread(Thread):
 
     def __init__(self, wiimmfi_thread, *args, **kwargs):
         self.wiimmfi_thread = wiimmfi_thread
+        self.cancelled = threading.Event()
 
         super().__init__(*args, **kwargs)
 
+    def cancel(self):
+        """Stops the refresh. Fetches that are already in flight are dropped."""
+        self.cancelled.set()
+
+    def _fetch_game(self, game):
+        if self.cancelled.is_set():
+            return game, None
+
+        return game, self.wiimmfi_thread.get_online_players(game.game_id)
+
     def execute(self):
         active_games = self.wiimmfi_thread.get_active_games()
         active_games = sorted(active_games, key=lambda g: g.online_players, reverse=True)
 
         self.emit_progress(20)
 
-        game_num = 1
-        for game in active_games:
-            self.emit_message(f'Fetching {game.game_id}...')
-            progress = round(game_num / len(active_games) * 80) + 20
-            self.emit_progress(progress)
+        workers = self.wiimmfi_thread.poll_engine.concurrency
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='PlayerFetchWorker') as pool:
+            # submitted busiest first, results are streamed back in the order they complete
+            futures = [pool.submit(self._fetch_game, game) for game in active_games]
 
-            online_players = self.wiimmfi_thread.get_online_players(game.game_id)
-            if not online_players:  # activity changed during our scan
-                continue
-            online_players = sorted(online_players, key=lambda p: p.player_1)
+            completed = 0
+            for future in as_completed(futures):
+                if self.cancelled.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    break
 
-            game_data = {
-                'game': game,
-                'players': online_players
-            }
-            self.emit_data(game_data)
+                game, online_players = future.result()
 
-            game_num += 1
+                completed += 1
+                self.emit_message(f'Fetched {game.game_id} ({completed}/{len(active_games)})')
+                self.emit_progress(round(completed / len(active_games) * 80) + 20)
+
+                if not online_players:  # activity changed during our scan
+                    continue
+                online_players = sorted(online_players, key=lambda p: p.player_1)
+
+                game_data = {
+                    'game': game,
+                    'players': online_players
+                }
+                self.emit_data(game_data)
 
 
 class OnlinePlayerTab(Qw.QWidget):
@@ -52,6 +76,7 @@ class OnlinePlayerTab(Qw.QWidget):
         self.config = params.get('config')
 
         self.refresh_button = None
+        self.player_fetch_thread = None
 
         self.header = self.create_header()
         self.player_tree = self.create_tree()
@@ -66,28 +91,27 @@ class OnlinePlayerTab(Qw.QWidget):
         game_id = widget.text(0)
         friend_code = widget.text(2)
 
-        item = {
-            'console': console,
-            'game_id': game_id,
-            'friend_code': friend_code,
-            'priority': '1'
-        }
-        self.config.friend_codes.append(item)
+        self.config.friend_codes.add(FriendCode(console, game_id, friend_code))
 
         self.player_tree.itemWidget(widget, 3).setDisabled(True)
 
     def _refresh_tree(self):
-        self.refresh_button.setDisabled(True)
+        if self.player_fetch_thread is not None:
+            # the user wants to start over, drop the refresh that is still running
+            self.player_fetch_thread.cancel()
+
         self.player_tree.clear()
 
-        player_fetch_thread = WiimmfiOnlinePlayerFetchThread(self.parent.wiimmfi_thread)
-        player_fetch_thread.signals.data.connect(self._player_fetch_callback)
-        player_fetch_thread.signals.finished.connect(self._refresh_done_callback)
+        self.player_fetch_thread = WiimmfiOnlinePlayerFetchThread(self.parent.wiimmfi_thread)
+        self.player_fetch_thread.signals.data.connect(self._player_fetch_callback)
+        self.player_fetch_thread.signals.finished.connect(self._refresh_done_callback)
 
-        self.parent.thread_manager.add_thread(player_fetch_thread)
+        self.parent.thread_manager.add_thread(self.player_fetch_thread)
 
     def _player_fetch_callback(self, data: dict):
-        friend_codes = [code.get('friend_code') for code in self.config.friend_codes]
+        if self.sender() is not self.player_fetch_thread.signals:
+            # late result of a cancelled refresh
+            return
 
         game = data.get('game')
         online_players = data.get('players')
@@ -108,7 +132,7 @@ class OnlinePlayerTab(Qw.QWidget):
             add_button.setMaximumSize(32, 32)
             # we copy "child_item" into the lambda's scope as "child"
             add_button.pressed.connect(lambda child=child_item: self._add_friendcode(child))
-            if player.friend_code in friend_codes:
+            if (player.game_id, player.friend_code) in self.config.friend_codes:
                 add_button.setDisabled(True)
 
             self.player_tree.setItemWidget(child_item, 3, add_button)
@@ -120,7 +144,8 @@ class OnlinePlayerTab(Qw.QWidget):
         self.player_tree.resizeColumnToContents(3)
 
     def _refresh_done_callback(self):
-        self.refresh_button.setDisabled(False)
+        if self.sender() is self.player_fetch_thread.signals:
+            self.player_fetch_thread = None
 
     def _search_tree(self, text):
         search_text = text.lower()
@@ -4,8 +4,6 @@ from pathlib import Path
 from PyQt5 import QtGui as Qg
 from PyQt5 import QtWidgets as Qw
 
-import util
-
 cache_dir = Path(sys.argv[0]).parent / 'data' / 'cache'
 
 
@@ -22,6 +20,10 @@ class OverviewTab(Qw.QWidget):
 
         self.config = params.get('config')
 
+        self._pixmaps = dict()  # game_id: QPixmap
+        self._image_game_id = None
+        self._values = [''] * 12  # what the properties table currently shows
+
         self.overview_group = self.create_overview_group()
         self.mkw_group = self.create_mkw_group()
 
@@ -32,9 +34,10 @@ class OverviewTab(Qw.QWidget):
 
         self.setLayout(self.layout)
 
-        self.update_thread = util.WiimmfiOverviewThread(self.parent.wiimmfi_thread,
-                                                        self.update_status, self.clear_overview)
-        self.parent.thread_manager.add_thread(self.update_thread)
+        # only called when the presence actually changes
+        self.parent.wiimmfi_thread.state_changed.connect(self.on_state_changed)
+        if self.parent.wiimmfi_thread.state.version:
+            self.on_state_changed(self.parent.wiimmfi_thread.state)
 
     def create_overview_group(self):
         groupbox = Qw.QGroupBox('Presence Overview')
@@ -58,7 +61,7 @@ class OverviewTab(Qw.QWidget):
         groupbox = Qw.QGroupBox('Advanced Properties')
 
         self.advanced_properties = Qw.QTableWidget()
-        self.advanced_properties.setRowCount(11)
+        self.advanced_properties.setRowCount(12)
         self.advanced_properties.setColumnCount(2)
         self.advanced_properties.setEditTriggers(Qw.QTableWidget.NoEditTriggers)
         self.advanced_properties.horizontalHeader().setVisible(False)
@@ -79,27 +82,57 @@ class OverviewTab(Qw.QWidget):
         self.advanced_properties.setItem(10, 0, Qw.QTableWidgetItem('Room players'))
         self.advanced_properties.setItem(11, 0, Qw.QTableWidgetItem('Track Name'))
 
+        # value cells are created once and only get their text updated afterwards
+        for row in range(12):
+            self.advanced_properties.setItem(row, 1, Qw.QTableWidgetItem(''))
+
         layout = Qw.QHBoxLayout()
         layout.addWidget(self.advanced_properties)
         groupbox.setLayout(layout)
 
         return groupbox
 
+    def on_state_changed(self, state):
+        if state.player is not None:
+            self.update_status(state.player)
+        else:
+            self.clear_overview()
+
     def update_status(self, player):
         self.set_image(player.game_id, player.game_name)
         self.set_overview(player)
         self.set_properties(player)
 
+    def _get_pixmap(self, game_id):
+        pixmap = self._pixmaps.get(game_id)
+        if pixmap is None:
+            img_path = cache_dir / f'{game_id}.png'
+            if not img_path.exists():
+                img_path = cache_dir / 'no_image.png'
+
+            pixmap = Qg.QPixmap(str(img_path.resolve()))
+            self._pixmaps[game_id] = pixmap
+
+        return pixmap
+
     def set_image(self, game_id, game_name):
-        img_path = cache_dir / f'{game_id}.png'
-        if not img_path.exists():
-            img_path = cache_dir / 'no_image.png'
+        if game_id == self._image_game_id:
+            return
+        self._image_game_id = game_id
 
-        path = str(img_path.resolve())
-        pixmap = Qg.QPixmap(path)
-        self.image.setPixmap(pixmap)
+        self.image.setPixmap(self._get_pixmap(game_id))
         self.image.setToolTip(game_name)
 
+    def _set_values(self, values):
+        """Only touches the cells whose value actually changed."""
+        for row, value in enumerate(values):
+            text = '' if value is None else str(value)
+            if self._values[row] == text:
+                continue
+
+            self._values[row] = text
+            self.advanced_properties.item(row, 1).setText(text)
+
     def set_overview(self, player):
         text = '''
         <html>
@@ -124,26 +157,27 @@ class OverviewTab(Qw.QWidget):
         self.presence_overview.setText(fmt_text)
 
     def set_properties(self, player):
-        self.advanced_properties.setItem(0, 1, Qw.QTableWidgetItem(player.game_id))
-        self.advanced_properties.setItem(1, 1, Qw.QTableWidgetItem(player.game_name))
-        self.advanced_properties.setItem(2, 1, Qw.QTableWidgetItem(player.pid))
-        self.advanced_properties.setItem(3, 1, Qw.QTableWidgetItem(player.friend_code))
-        self.advanced_properties.setItem(4, 1, Qw.QTableWidgetItem(player.status))
-        self.advanced_properties.setItem(5, 1, Qw.QTableWidgetItem(player.player_1))
-        self.advanced_properties.setItem(6, 1, Qw.QTableWidgetItem(player.player_2))
-        self.advanced_properties.setItem(7, 1, Qw.QTableWidgetItem(player.priority))
-        self.advanced_properties.setItem(8, 1, Qw.QTableWidgetItem(player.start))
+        values = [
+            player.game_id,
+            player.game_name,
+            player.pid,
+            player.friend_code,
+            player.status,
+            player.player_1,
+            player.player_2,
+            player.priority,
+            player.start
+        ]
 
         if player.is_mkw:
-            self.advanced_properties.setItem(9, 1, Qw.QTableWidgetItem(player.n_members))
-            self.advanced_properties.setItem(10, 1, Qw.QTableWidgetItem(player.n_players))
-            self.advanced_properties.setItem(11, 1, Qw.QTableWidgetItem(player.track_name))
+            values += [player.n_members, player.n_players, player.track_name]
         else:
-            for item in range(9, 12):
-                self.advanced_properties.setItem(item, 1, Qw.QTableWidgetItem(''))
+            values += ['', '', '']
+
+        self._set_values(values)
 
     def clear_overview(self):
         self.image.clear()
+        self._image_game_id = None
         self.presence_overview.setText('Not playing anything.')
-        for item in range(12):
-            self.advanced_properties.setItem(item, 1, Qw.QTableWidgetItem(''))
+        self._set_values([''] * 12)
@@ -0,0 +1,87 @@
+from pathlib import Path
+
+import pytest
+
+from util.parsers import available_parsers, get_parser
+from util.wiimmfi import WiimmfiGame, WiimmfiGameListThread, WiimmfiPlayerList
+
+pages_dir = Path(__file__).parent / 'pages'
+
+
+def read_page(name):
+    return (pages_dir / name).read_text(encoding='utf-8')
+
+
+def online_players(parser, friend_codes=None):
+    rows = parser.table_rows(read_page('game_RMCJ.html'), 'online')
+    players = WiimmfiPlayerList.from_rows(rows[0].text, rows[2:], friend_codes=friend_codes)
+
+    # `start` is the time of the parse, everything else has to match
+    return [(p.game_name, p.game_id, p.pid, p.friend_code, p.status, p.player_1, p.player_2) for p in players]
+
+
+def active_games(parser):
+    rows = parser.class_rows(read_page('active_games.html'), ('tr0', 'tr1'))
+    games = [WiimmfiGame.from_row(row) for row in rows]
+
+    return [(g.console, g.game_id, g.game_name, g.online_players) for g in games]
+
+
+def game_list(parser):
+    rows = parser.table_rows(read_page('game_list.html'), 'game')
+    return WiimmfiGameListThread.games_from_rows(rows[2:])
+
+
+@pytest.mark.parametrize('name', available_parsers())
+def test_online_players(name):
+    assert online_players(get_parser(name)) == [
+        ('Mario Kart Wii', 'RMCJ', '600123456', '1234-5678-9012', '1', 'Sam\xa0&\xa0Kim', ''),
+        ('Mario Kart Wii', 'RMCJ', '600765432', '4321-8765-2109', '2', 'Player One', 'Player Two'),
+        ('Mario Kart Wii', 'rmcj', '600111222', '0000-1111-2222', '5', 'Bold Name', ''),
+    ]
+
+
+@pytest.mark.parametrize('name', available_parsers())
+def test_online_players_filtered(name):
+    assert [player[3] for player in online_players(get_parser(name), {'4321-8765-2109'})] == ['4321-8765-2109']
+
+
+@pytest.mark.parametrize('name', available_parsers())
+def test_active_games(name):
+    # rows are ordered by class first, tr0 before tr1
+    assert active_games(get_parser(name)) == [
+        ('Wii', 'rmcj', 'Mario Kart Wii', 142),
+        ('WiiWare', 'wrxe', 'Dr. Mario & Germ Buster', 0),
+        ('NDS', 'amcj', 'Mario Kart DS', 17),
+        ('Wii', 'rsbe', 'Super Smash Bros. Brawl US', 3),
+    ]
+
+
+@pytest.mark.parametrize('name', available_parsers())
+def test_game_list(name):
+    assert game_list(get_parser(name)) == [
+        {'id': 'RMCJ', 'name': 'Mario Kart Wii'},
+        {'id': 'AMCJ', 'name': 'Mario Kart DS'},
+        {'id': 'WRXE', 'name': 'Dr. Mario & Germ Buster (WiiWare)'},
+        {'id': 'RSBE', 'name': 'Super Smash Bros.\xa0Brawl'},
+    ]
+
+
+@pytest.mark.parametrize('name', available_parsers())
+def test_backends_agree(name):
+    reference = get_parser('bs4')
+    parser = get_parser(name)
+
+    for page, table_id in (('game_RMCJ.html', 'online'), ('game_list.html', 'game'), ('game_RMCJ.html', 'footer')):
+        assert parser.table_rows(read_page(page), table_id) == reference.table_rows(read_page(page), table_id)
+    assert parser.table_rows(read_page('game_list.html'), 'missing') is None
+
+    page = read_page('active_games.html')
+    assert parser.class_rows(page, ('tr0', 'tr1')) == reference.class_rows(page, ('tr0', 'tr1'))
+
+
+def test_default_parser():
+    expected = 'lxml' if 'lxml' in available_parsers() else 'table'
+    assert get_parser().name == expected
+    assert get_parser('auto').name == expected
+    assert get_parser('bs4').name == 'bs4'
@@ -0,0 +1,29 @@
+from pathlib import Path
+
+from util.wiimmfi import WiimmfiPlayer, WiimmfiPlayerList, page_fingerprint
+
+pages_dir = Path(__file__).parent / 'pages'
+
+
+def test_fingerprint_covers_later_rows():
+    page = (pages_dir / 'game_RMCJ.html').read_bytes()
+
+    # only the last player row changes, after the nested tables of the earlier rows
+    changed = page.replace(b'0000-1111-2222', b'0000-1111-3333')
+    assert changed != page
+    assert page_fingerprint(changed) != page_fingerprint(page)
+
+    renamed = page.replace(b'<b>Bold</b>', b'<b>Brave</b>')
+    assert page_fingerprint(renamed) != page_fingerprint(page)
+
+    assert page_fingerprint(page) == page_fingerprint(bytes(page))
+
+
+def test_player_list_copy():
+    players = WiimmfiPlayerList([WiimmfiPlayer(game_id='RMCJ', pid='1', friend_code='1234-5678-9012')])
+
+    copied = players.copy()
+    copied.get_player('1234-5678-9012').priority = 5
+
+    assert players.get_player('1234-5678-9012').priority == 1
+    assert copied.get_player_by_pid('1').priority == 5
@@ -1,14 +1,19 @@
 from .checks import *
 from .config import *
+from .history import *
 from .logging import *
 from .msgboxes import *
 from .network import *
+from .presence import *
+from .session import *
 from .threading import *
 from .updater import *
 from .wiimmfi import *
 
 __all__ = (
     'Config',
+    'FriendCode',
+    'FriendCodeStore',
     'GUILoggerHandler',
     'FileLoggerHandler',
     'Thread',
@@ -16,8 +21,11 @@ __all__ = (
     'full_check',
     'GithubDownloadThread',
     'MsgBoxes',
+    'HistoryStore',
+    'HTTPSession',
+    'http_session',
+    'DiscordPresenceThread',
     'WiimmfiCheckThread',
-    'WiimmfiOverviewThread',
     'WiimmfiGameListThread',
     'Updater'
 )
@@ -1,13 +1,32 @@
 import json
 import logging
+import os
+import threading
+from contextlib import contextmanager
 
 logging.getLogger(__name__)
 
+write_delay = 0.5  # seconds changes are held back, so bursts of them end up in a single write
+friend_codes_version = 2
+
 
 class JSONConfig:
+    """
+    A JSON file that behaves like the list or dict it contains.
+
+    Changes mark the config dirty and are written out after `write_delay` seconds
+    without further changes, or when a batch() block ends. flush() writes right away.
+    Writes are atomic: we write to a temporary file and rename it over the original.
+    """
+
     def __init__(self, path):
         self.path = path
 
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._batch_depth = 0
+        self._timer = None
+
         self.complete = True
         try:
             with open(path, 'r') as file:
@@ -16,31 +35,75 @@ class JSONConfig:
             self.complete = False
 
     def flush(self):
-        with open(self.path, 'w+') as file:
-            json.dump(self._config, file, indent=2)
+        """Writes the config to disk right away."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._dirty = False
+
+            tmp_path = os.fspath(self.path) + '.tmp'
+            with open(tmp_path, 'w+') as file:
+                json.dump(self._config, file, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def mark_dirty(self):
+        """Schedules a write. Repeated calls within `write_delay` are coalesced."""
+        with self._lock:
+            self._dirty = True
+            if self._batch_depth:
+                return
+
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(write_delay, self._write_pending)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _write_pending(self):
+        with self._lock:
+            if self._dirty:
+                self.flush()
+
+    @contextmanager
+    def batch(self):
+        """Holds back all writes until the block ends, then writes once."""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if not self._batch_depth and self._dirty:
+                    self.flush()
 
     def remove(self, item):
-        self._config.remove(item)
+        with self._lock:
+            self._config.remove(item)
 
-        self.flush()
+        self.mark_dirty()
 
     def append(self, item):
-        self._config.append(item)
+        with self._lock:
+            self._config.append(item)
 
-        self.flush()
+        self.mark_dirty()
 
     def __getitem__(self, item):
         return self._config[item]
 
     def __setitem__(self, key, value):
-        self._config[key] = value
+        with self._lock:
+            self._config[key] = value
 
-        self.flush()
+        self.mark_dirty()
 
     def __delitem__(self, key):
-        del self._config[key]
+        with self._lock:
+            del self._config[key]
 
-        self.flush()
+        self.mark_dirty()
 
     def __next__(self):
         return next(iter(self._config))
@@ -49,9 +112,183 @@ class JSONConfig:
         return iter(self._config)
 
 
+class FriendCode:
+    """A single watched friend code. Identified by (game_id, friend_code)."""
+
+    def __init__(self, console: str, game_id: str, friend_code: str, priority: int = 1):
+        if console == 'DS':  # backwards compat
+            console = 'NDS'
+
+        self.console = console
+        self.game_id = game_id.upper()
+        self.friend_code = friend_code
+        if priority in ('', None):
+            priority = 1
+        self.priority = int(priority)
+
+    @property
+    def key(self):
+        return self.game_id, self.friend_code
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(console=data.get('console'),
+                   game_id=data.get('game_id') or '',
+                   friend_code=data.get('friend_code'),
+                   priority=data.get('priority'))
+
+    def to_dict(self):
+        return {
+            'console': self.console,
+            'game_id': self.game_id,
+            'friend_code': self.friend_code,
+            'priority': self.priority
+        }
+
+    def __eq__(self, other):
+        if isinstance(other, FriendCode):
+            return self.to_dict() == other.to_dict()
+        return False
+
+    def __repr__(self):
+        return f'<FriendCode {self.game_id} {self.friend_code} p{self.priority}>'
+
+
+class FriendCodeStore(JSONConfig):
+    """
+    Our friend code list, keyed on (game_id, friend_code) and indexed by game and priority.
+
+    The file used to be a plain list of string-valued dicts (version 1).
+    Those files are migrated to the current format when they're loaded.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+
+        self._codes = dict()  # key: FriendCode, in insertion order
+        self._by_game = dict()  # game_id: {key: FriendCode}
+        self._by_priority = dict()  # priority: {key: FriendCode}
+
+        if not self.complete:
+            self._config = {'version': friend_codes_version, 'codes': []}
+            return
+
+        if isinstance(self._config, list):
+            entries = self._config
+            migrated = True
+        else:
+            entries = self._config.get('codes', [])
+            migrated = False
+
+        for entry in entries:
+            try:
+                code = FriendCode.from_dict(entry)
+            except (ValueError, TypeError, AttributeError):
+                logging.warning(f'Dropping invalid friend code entry: {entry}')
+                migrated = True
+                continue
+
+            if not code.game_id or not code.friend_code:
+                logging.warning(f'Dropping invalid friend code entry: {entry}')
+                migrated = True
+                continue
+            if code.key in self._codes:
+                migrated = True  # duplicates were possible in the old format
+            self._index(code)
+
+        if migrated:
+            logging.info(f'Migrated {len(self._codes)} friend codes to version {friend_codes_version}')
+            self.flush()
+
+    def _index(self, code):
+        self._unindex(code.key)
+        self._codes[code.key] = code
+        self._by_game.setdefault(code.game_id, dict())[code.key] = code
+        self._by_priority.setdefault(code.priority, dict())[code.key] = code
+
+    def _unindex(self, key):
+        code = self._codes.pop(key, None)
+        if code is None:
+            return None
+
+        for index, index_key in ((self._by_game, code.game_id), (self._by_priority, code.priority)):
+            entries = index[index_key]
+            del entries[key]
+            if not entries:
+                del index[index_key]
+
+        return code
+
+    def flush(self):
+        with self._lock:
+            self._config = {
+                'version': friend_codes_version,
+                'codes': [code.to_dict() for code in self._codes.values()]
+            }
+            super().flush()
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._codes.values()))
+
+    def __contains__(self, key):
+        """Checks for a (game_id, friend_code) tuple."""
+        game_id, friend_code = key
+        return (game_id.upper(), friend_code) in self._codes
+
+    def get(self, game_id, friend_code):
+        return self._codes.get((game_id.upper(), friend_code))
+
+    def add(self, code: FriendCode):
+        """Adds a friend code, replacing the one with the same key if there is one."""
+        with self._lock:
+            self._index(code)
+
+        self.mark_dirty()
+
+    def remove(self, code: FriendCode):
+        """Removes a friend code. Returns False if we didn't have it."""
+        with self._lock:
+            removed = self._unindex(code.key)
+
+        if removed is not None:
+            self.mark_dirty()
+        return removed is not None
+
+    def update(self, old: FriendCode, new: FriendCode):
+        """Replaces `old` with `new`, which may have a different key."""
+        with self._lock:
+            self._unindex(old.key)
+            self._index(new)
+
+        self.mark_dirty()
+
+    # the JSONConfig list interface, for callers that still append/remove
+    append = add
+
+    def by_game(self):
+        """
+        Groups the friend codes by game.
+        :return: dict - {game_id: [FriendCode]}
+        """
+        with self._lock:
+            return {game_id: list(codes.values()) for game_id, codes in self._by_game.items()}
+
+    def by_priority(self, priority):
+        with self._lock:
+            return list(self._by_priority.get(int(priority), dict()).values())
+
+    def priorities(self):
+        with self._lock:
+            return sorted(self._by_priority)
+
+
 class Config:
     def __init__(self, **files):
-        self.friend_codes = JSONConfig(files.get('friend_codes'))
+        self.friend_codes = FriendCodeStore(files.get('friend_codes'))
         self.preferences = JSONConfig(files.get('preferences'))
         self.version_info = JSONConfig(files.get('version_info'))
         self.statuses = JSONConfig(files.get('statuses'))
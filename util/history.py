@@ -0,0 +1,243 @@
+import logging
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+from .threading import Thread
+
+logging.getLogger(__name__)
+
+history_path = Path(sys.argv[0]).parent / 'data' / 'history.sqlite3'
+history_batch_size = 500  # polls written per transaction, at most
+history_flush_interval = 1  # seconds the writer waits for more polls before committing
+history_retention = 30 * 24 * 60 * 60  # seconds sightings are kept around, sessions are kept forever
+
+schema = '''
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    game_id TEXT NOT NULL,
+    friend_code TEXT NOT NULL,
+    started REAL NOT NULL,
+    ended REAL
+);
+CREATE INDEX IF NOT EXISTS sessions_code ON sessions (game_id, friend_code, started);
+CREATE INDEX IF NOT EXISTS sessions_open ON sessions (ended) WHERE ended IS NULL;
+
+CREATE TABLE IF NOT EXISTS sightings (
+    game_id TEXT NOT NULL,
+    friend_code TEXT NOT NULL,
+    seen REAL NOT NULL,
+    status TEXT,
+    player_1 TEXT,
+    player_2 TEXT
+);
+CREATE INDEX IF NOT EXISTS sightings_code ON sightings (game_id, friend_code, seen);
+'''
+
+
+class HistoryStore:
+    """
+    Local SQLite history of who was online, and when.
+
+    Every poll of a game is recorded as sightings of the watched friend codes that were
+    online. Consecutive sightings form a session, which ends at the last time we saw
+    the player. Writes are queued and committed in batches by a HistoryWriterThread;
+    queries use a per-thread connection and never wait on the writer, since the
+    database runs in WAL mode.
+    """
+
+    def __init__(self, path=history_path):
+        self.path = path
+        self.queue = queue.Queue()
+        self.writer = HistoryWriterThread(self)
+
+        self._local = threading.local()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self.connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(schema)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def connect(self):
+        conn = sqlite3.connect(str(self.path), timeout=10)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _reader(self):
+        # sqlite connections can't be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self.connect()
+        return conn
+
+    def record_poll(self, game_id, sightings, seen=None):
+        """
+        Queues the result of a single game poll. Open sessions of this game
+        that have no sighting in it are ended.
+        :param game_id: str
+        :param sightings: list of (friend_code, status, player_1, player_2) for the watched players that were online
+        :param seen: time of the poll, defaults to now
+        """
+        self.queue.put((game_id, list(sightings), seen or time.time()))
+
+    def end_sessions(self):
+        """Ends all open sessions at their last sighting, for when we stop polling altogether."""
+        self.queue.put((None, [], time.time()))
+
+    def flush(self):
+        """Asks the writer to commit right away, and blocks until all queued polls are written."""
+        if self.writer.isRunning():
+            self.queue.put(None)
+            self.queue.join()
+
+    def last_seen(self, game_id, friend_code):
+        """
+        :return: float - timestamp of the last sighting, or None if we've never seen them
+        """
+        row = self._reader().execute('SELECT MAX(seen) FROM sightings WHERE game_id = ? AND friend_code = ?',
+                                     (game_id, friend_code)).fetchone()
+        if row[0] is not None:
+            return row[0]
+
+        # sightings expire before sessions do
+        row = self._reader().execute('SELECT MAX(COALESCE(ended, started)) FROM sessions '
+                                     'WHERE game_id = ? AND friend_code = ?', (game_id, friend_code)).fetchone()
+        return row[0]
+
+    def last_seen_all(self):
+        """
+        :return: dict - {(game_id, friend_code): end of the last session, or now if it's still open}
+        """
+        seen = dict()
+        for game_id, friend_code, timestamp in self._reader().execute(
+                'SELECT game_id, friend_code, MAX(COALESCE(ended, ?)) FROM sessions '
+                'GROUP BY game_id, friend_code', (time.time(),)):
+            seen[(game_id, friend_code)] = timestamp
+        return seen
+
+    def online(self):
+        """
+        :return: set - (game_id, friend_code) of every open session
+        """
+        rows = self._reader().execute('SELECT game_id, friend_code FROM sessions WHERE ended IS NULL')
+        return set(rows)
+
+    def sessions(self, game_id, friend_code, since=None):
+        """
+        :param since: only return sessions that were still going at this time, optional
+        :return: list of (started, ended), oldest first. `ended` is None while a session is open.
+        """
+        return self._reader().execute('SELECT started, ended FROM sessions '
+                                      'WHERE game_id = ? AND friend_code = ? AND COALESCE(ended, ?) >= ? '
+                                      'ORDER BY started', (game_id, friend_code, time.time(), since or 0)).fetchall()
+
+    def session_durations(self, since=None):
+        """
+        Total session time per friend code. Open sessions count up to now,
+        sessions that started before `since` only count from `since` on.
+        :param since: timestamp, optional
+        :return: dict - {(game_id, friend_code): seconds}
+        """
+        now = time.time()
+        since = since or 0
+
+        durations = dict()
+        for game_id, friend_code, seconds in self._reader().execute(
+                'SELECT game_id, friend_code, SUM(COALESCE(ended, ?) - MAX(started, ?)) FROM sessions '
+                'WHERE COALESCE(ended, ?) >= ? GROUP BY game_id, friend_code', (now, since, now, since)):
+            durations[(game_id, friend_code)] = seconds
+        return durations
+
+
+class HistoryWriterThread(Thread):
+    """
+    The only thread writing to the history database.
+
+    Queued polls are collected for up to `history_flush_interval` seconds and written in
+    a single transaction, so frequent polling doesn't turn into a commit per game.
+    A None in the queue is a flush request, it ends the batch right away.
+    """
+    friendly_progress = ''
+    permanent = True
+    name = 'HistoryWriterThread'
+
+    def __init__(self, store, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.store = store
+        self._open = dict()  # (game_id, friend_code): last seen, for every open session
+
+    def execute(self):
+        conn = self.store.connect()
+        self.close_stale_sessions(conn)
+
+        while True:
+            batch = [self.store.queue.get()]
+            deadline = time.monotonic() + history_flush_interval
+            while batch[-1] is not None and len(batch) < history_batch_size:
+                try:
+                    batch.append(self.store.queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            try:
+                self.write(conn, [poll for poll in batch if poll is not None])
+            except sqlite3.Error as e:
+                self.log(logging.ERROR, f'Could not write {len(batch)} polls to the history: {e}')
+            finally:
+                for _ in batch:
+                    self.store.queue.task_done()
+
+    def close_stale_sessions(self, conn):
+        """Ends the sessions left open by the last run at their last sighting, and drops old sightings."""
+        with conn:
+            closed = conn.execute('''
+                UPDATE sessions SET ended = COALESCE(
+                    (SELECT MAX(seen) FROM sightings
+                     WHERE sightings.game_id = sessions.game_id
+                       AND sightings.friend_code = sessions.friend_code
+                       AND sightings.seen >= sessions.started),
+                    started)
+                WHERE ended IS NULL
+            ''').rowcount
+            pruned = conn.execute('DELETE FROM sightings WHERE seen < ?',
+                                  (time.time() - history_retention,)).rowcount
+
+        self.log(logging.DEBUG, f'History: closed {closed} stale sessions, pruned {pruned} sightings')
+
+    def write(self, conn, batch):
+        if not batch:
+            return
+
+        rows = []
+        session_changes = []  # a session can end and start again within one batch, so these stay in order
+        for game_id, sightings, seen in batch:
+            online = set()
+            for friend_code, status, player_1, player_2 in sightings:
+                rows.append((game_id, friend_code, seen, status, player_1, player_2))
+                online.add(friend_code)
+
+                key = (game_id, friend_code)
+                if key not in self._open:
+                    session_changes.append(('INSERT INTO sessions (game_id, friend_code, started) VALUES (?, ?, ?)',
+                                            (game_id, friend_code, seen)))
+                self._open[key] = seen
+
+            # also ends sessions of friend codes that were removed from the list.
+            # A game ID of None ends the sessions of every game.
+            for key in [key for key in self._open if game_id in (None, key[0]) and key[1] not in online]:
+                session_changes.append(('UPDATE sessions SET ended = ? '
+                                        'WHERE game_id = ? AND friend_code = ? AND ended IS NULL',
+                                        (self._open.pop(key),) + key))
+
+        with conn:
+            for statement, params in session_changes:
+                conn.execute(statement, params)
+            conn.executemany('INSERT INTO sightings VALUES (?, ?, ?, ?, ?, ?)', rows)
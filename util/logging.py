@@ -1,67 +1,319 @@
+import heapq
 import logging
+import logging.handlers
 import os
+import queue
 import sys
+import threading
+import time
+from collections import deque, namedtuple
 from datetime import datetime
 from pathlib import Path
 
 from util import checks
 
+log_dir = Path(sys.argv[0]).parent / 'logs'
+log_max_size = 2 * 1024 * 1024  # bytes per log file before we start a new one
+log_max_age = 24 * 60 * 60  # seconds per log file before we start a new one
+log_retention = 10  # number of log files to keep around
+log_flush_interval = 1  # seconds between flushes of the write buffer
 
-class GUILoggerHandler(logging.Handler):
-    """Allows logging to a PyQt5 PlainTextEdit widget."""
+gui_log_capacity = 5000  # records kept in memory for the Logs tab
 
-    def __init__(self, widget=None):
-        super().__init__()
+LogEntry = namedtuple('LogEntry', ('created', 'levelno', 'levelname', 'thread_name', 'message', 'text'))
+
+
+class LogRecordStore:
+    """
+    Fixed-capacity ring buffer of LogEntry records, indexed by level, thread name and time.
+
+    Every record gets an increasing sequence number. Once the store is full, the oldest
+    records are dropped; `first_seq` and `next_seq` tell which sequence numbers are still around.
+    All methods are thread-safe.
+    """
+
+    def __init__(self, capacity=gui_log_capacity):
+        self.capacity = capacity
+
+        self._lock = threading.Lock()
+        self._entries = [None] * capacity  # slot seq % capacity holds record seq
+        self._first_seq = 0
+        self._next_seq = 0
+        self._by_level = dict()  # levelno: deque of seqs
+        self._by_thread = dict()  # thread name: deque of seqs
+
+    def __len__(self):
+        return self._next_seq - self._first_seq
 
-        self._widget = widget
-        self._buffer = ''
+    @property
+    def first_seq(self):
+        return self._first_seq
 
     @property
-    def widget(self):
-        return self._widget
+    def next_seq(self):
+        return self._next_seq
 
-    @widget.setter
-    def widget(self, widget):
-        """We have been assigned a widget, flush the buffer log into it."""
-        self._widget = widget
-        self.append(self._buffer.strip())
+    def append(self, entry):
+        with self._lock:
+            if len(self) == self.capacity:
+                # the evicted record is the oldest one, so it sits at the front of its indexes
+                old = self._entries[self._first_seq % self.capacity]
+                self._by_level[old.levelno].popleft()
+                self._by_thread[old.thread_name].popleft()
+                self._first_seq += 1
 
-        self._buffer = None
+            seq = self._next_seq
+            self._entries[seq % self.capacity] = entry
+            self._by_level.setdefault(entry.levelno, deque()).append(seq)
+            self._by_thread.setdefault(entry.thread_name, deque()).append(seq)
+            self._next_seq += 1
 
-    def append(self, msg):
-        self.widget.appendPlainText(msg)
+            return seq
 
-    def emit(self, record):
-        msg = self.format(record)
+    def get(self, seq):
+        """Returns the record with sequence number `seq`, or None if it has been dropped."""
+        with self._lock:
+            if not self._first_seq <= seq < self._next_seq:
+                return None
+            return self._entries[seq % self.capacity]
+
+    def thread_names(self):
+        with self._lock:
+            return sorted(name for name, seqs in self._by_thread.items() if seqs)
+
+    def _seq_at_time(self, start, created):
+        """First seq from `start` on that was logged at or after `created`. Records are in time order."""
+        low, high = start, self._next_seq
+        while low < high:
+            mid = (low + high) // 2
+            if self._entries[mid % self.capacity].created < created:
+                low = mid + 1
+            else:
+                high = mid
+
+        return low
+
+    def query(self, min_level=None, thread_name=None, since=None, text=None, start=None):
+        """
+        Returns the sequence numbers of all matching records, oldest first.
+        :param min_level: int, only records of this level or higher
+        :param thread_name: str, only records logged from this thread
+        :param since: float, only records created at or after this timestamp
+        :param text: str, only records containing this text (case-insensitive)
+        :param start: int, only records with this sequence number or higher
+        :return: list of int
+        """
+        with self._lock:
+            start = max(start or 0, self._first_seq)
+            if since is not None:
+                start = self._seq_at_time(start, since)
+
+            # start from the smallest index we've got, and check the other filters per record
+            candidates = None
+            if thread_name is not None:
+                candidates = self._by_thread.get(thread_name, ())
+            if min_level is not None:
+                level_seqs = [seqs for level, seqs in self._by_level.items() if level >= min_level]
+                if candidates is None or sum(map(len, level_seqs)) < len(candidates):
+                    candidates = heapq.merge(*level_seqs)
+            if candidates is None:
+                candidates = range(start, self._next_seq)
 
-        if self.widget is None:
-            #  No widget yet to log to, save log into buffer.
-            self._buffer += msg + '\n'
+            text = text.lower() if text else None
+
+            result = []
+            for seq in candidates:
+                if seq < start:
+                    continue
+
+                entry = self._entries[seq % self.capacity]
+                if min_level is not None and entry.levelno < min_level:
+                    continue
+                if thread_name is not None and entry.thread_name != thread_name:
+                    continue
+                if text is not None and text not in entry.text.lower():
+                    continue
+
+                result.append(seq)
+
+            return result
+
+
+class GUILoggerHandler(logging.Handler):
+    """
+    Keeps log records around for the Logs tab.
+
+    Records are stored in a LogRecordStore, whether the tab exists or not.
+    The handler never touches any widgets, since logging may happen from any thread;
+    the tab reads new records from the store on the GUI thread instead.
+    """
+
+    def __init__(self, capacity=gui_log_capacity):
+        super().__init__()
+
+        self.store = LogRecordStore(capacity)
+
+    def emit(self, record):
+        try:
+            entry = LogEntry(created=record.created,
+                             levelno=record.levelno,
+                             levelname=record.levelname,
+                             thread_name=record.threadName,
+                             message=record.getMessage(),
+                             text=self.format(record))
+        except Exception:
+            self.handleError(record)
             return
 
-        self.append(msg)
+        self.store.append(entry)
+
 
+class LogFileWriter(logging.Handler):
+    """
+    Appends already formatted records to the current log file, using buffered writes.
+    The buffer is flushed every `log_flush_interval` seconds while records keep coming in,
+    and by the FlushingQueueListener as soon as they stop.
+
+    A new file is started once the current one grows beyond `log_max_size` or gets older
+    than `log_max_age`. Only the newest `log_retention` log files are kept.
+    """
 
-class FileLoggerHandler(logging.Handler):
-    """Keeps track of all logs and stores them in a file. Features error log generation."""
     def __init__(self):
         super().__init__()
 
-        self._fn = self._get_filename()
-        self._buffer = ''
+        self._date = None
+        self._ext = -1
+        self.fn = self._get_filename()
+        self._file = None
+        self._size = 0
+        self._opened = 0
+        self._flushed = 0
 
     def _get_filename(self):
-        log_dir = (Path(sys.argv[0]).parent / 'logs')
-        time = datetime.now()
+        time_text = datetime.now().strftime('%Y%m%d')
+        if time_text != self._date:
+            self._date = time_text
+            self._ext = -1
 
-        time_text = time.strftime('%Y%m%d')
-        ext = 0
-        file = (log_dir / f'{time_text}.log')
-        while file.exists():
-            file = (log_dir / f'{time_text}-{ext}.log')
-            ext += 1
+        # never go back to a lower number, even if that file has been cleaned up since
+        while True:
+            if self._ext < 0:
+                file = (log_dir / f'{time_text}.log')
+            else:
+                file = (log_dir / f'{time_text}-{self._ext}.log')
+            self._ext += 1
 
-        return file
+            if not file.exists():
+                return file
+
+    def _open(self):
+        log_dir.mkdir(parents=True, exist_ok=True)
+
+        self._file = open(self.fn, 'a', encoding='utf-8')
+        self._size = self._file.tell()
+        self._opened = time.monotonic()
+
+    def _rotate(self):
+        self._file.close()
+
+        self.fn = self._get_filename()
+        self._open()
+
+        # throw away the oldest logs
+        logs = sorted(log_dir.glob('*.log'), key=lambda f: f.stat().st_mtime)
+        for old_log in logs[:-log_retention]:
+            try:
+                old_log.unlink()
+            except OSError:
+                pass
+
+    def emit(self, record):
+        try:
+            if self._file is None:
+                self._open()
+            elif self._size >= log_max_size or time.monotonic() - self._opened >= log_max_age:
+                self._rotate()
+
+            msg = self.format(record) + '\n'
+            self._file.write(msg)
+            self._size += len(msg)
+
+            now = time.monotonic()
+            if now - self._flushed >= log_flush_interval:
+                self._file.flush()
+                self._flushed = now
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self._file is not None:
+                self._file.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self.acquire()
+        try:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        finally:
+            self.release()
+
+        super().close()
+
+
+class FlushingQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener that flushes its handlers whenever it has caught up with the queue.
+
+    Bursts of records still share a single flush, but a record never sits in
+    a write buffer while we're idle.
+    """
+
+    def handle(self, record):
+        super().handle(record)
+
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+
+class FileLoggerHandler(logging.handlers.QueueHandler):
+    """
+    Keeps track of all logs and stores them in a file. Features error log generation.
+
+    Records are formatted on the logging thread and handed to a background
+    listener, which does the actual writing through a LogFileWriter.
+    """
+
+    def __init__(self):
+        super().__init__(queue.Queue())
+
+        self._writer = LogFileWriter()
+        self._listener = FlushingQueueListener(self.queue, self._writer)
+        self._listener.start()
+        self._listening = True
+
+    @property
+    def _fn(self):
+        return self._writer.fn
+
+    def flush(self):
+        """Blocks until every pending record has been written to disk."""
+        if self._listening:
+            self.queue.join()
+        self._writer.flush()
+
+    def close(self):
+        if self._listening:
+            self._listening = False
+            self._listener.stop()
+        self._writer.close()
+
+        super().close()
 
     def _get_dir_structure(self, path):
         files = []
@@ -78,6 +330,9 @@ class FileLoggerHandler(logging.Handler):
         return files
 
     def create_error_log(self, traceback):
+        # make sure everything leading up to the crash made it into the log
+        self.flush()
+
         script_dir = Path(sys.argv[0]).parent
         error_log_path = (script_dir / 'logs' / 'errors' / self._fn.name)
         date = datetime.now().strftime('%c')
@@ -92,9 +347,3 @@ class FileLoggerHandler(logging.Handler):
 
         return error_log_path
 
-    def emit(self, record):
-        msg = self.format(record)
-
-        self._buffer += msg + '\n'
-        with open(self._fn, 'w+') as file:
-            file.write(self._buffer)
@@ -6,6 +6,7 @@ from pathlib import Path
 import requests
 
 from .msgboxes import MsgBoxes
+from .session import http_session
 from .threading import Thread
 
 data_dir = Path(sys.argv[0]).parent / 'data'
@@ -31,7 +32,10 @@ class GithubDownloadThread(Thread):
         file = self.url.split('/')[-1]
         file = file.split('?')[0]  # remove url params
 
-        resp = requests.request(self.method, self.url, headers=github_headers)
+        if self.method == 'GET':
+            resp = http_session.get_cached(self.url, headers=github_headers)
+        else:
+            resp = http_session.request(self.method, self.url, headers=github_headers)
 
         try:
             resp.raise_for_status()
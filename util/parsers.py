@@ -0,0 +1,342 @@
+import logging
+import re
+from collections import namedtuple
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+from bs4.element import NavigableString, PreformattedString, Tag
+
+try:
+    import lxml.html
+except ImportError:  # lxml is optional, we'll fall back to one of the other backends
+    lxml = None
+
+logging.getLogger(__name__)
+
+_whitespace = re.compile('[ \t\n\r\f]+')
+_skipped_tags = ('script', 'style')
+
+Row = namedtuple('Row', ('text', 'cells', 'links'))
+Row.__doc__ = """
+A single table row, independent of the parser backend that produced it.
+
+- text: str
+    All text inside the row, including header cells. Whitespace is collapsed and stripped.
+- cells: list
+    Text of every <td> cell in the row, cleaned up like `text`.
+- links: list
+    The href of the first link inside every <td> cell, or None.
+"""
+
+
+class StatsParser:
+    """
+    Parser backend boilerplate.
+
+    Backends extract table rows from the Wiimmfi stats pages.
+    They all assemble those rows with a _RowBuilder and only differ in how
+    the page is tokenized, so they produce the same rows and the objects
+    built from them are the same. tests/test_parsers.py checks this.
+
+    Subclasses should override the methods below.
+    """
+    name = 'generic'
+
+    def table_rows(self, text, table_id):
+        """
+        Returns all rows of the table with id `table_id`.
+        :return: list of Row, or None if the table does not exist
+        """
+        raise NotImplementedError('Subclasses of StatsParser should override StatsParser.table_rows()')
+
+    def class_rows(self, text, classes):
+        """
+        Returns all rows with one of the given classes, ordered by class first.
+        :return: list of Row
+        """
+        raise NotImplementedError('Subclasses of StatsParser should override StatsParser.class_rows()')
+
+
+def _clean(text):
+    """Collapses whitespace like a browser would. Non-breaking spaces are kept."""
+    return _whitespace.sub(' ', text).strip(' ')
+
+
+class _RowBuilder:
+    """
+    Assembles Rows from a stream of start tag, end tag and text events.
+
+    Every backend feeds its own parse into one of these, in document order, so they
+    all agree on what a row and a cell is, no matter how they build their tree:
+    - a new <tr> or <td> implicitly closes the open one, like browsers do
+    - tables nested inside a cell are just part of that cell's text
+    - <script> and <style> contents are not text
+    - whitespace is collapsed and stripped
+    """
+
+    def __init__(self, table_id=None, classes=()):
+        self.table_id = table_id
+        self.classes = classes
+
+        self.found_table = False
+        self.rows = {cls: [] for cls in classes}
+        self.table_rows = []
+
+        self._table_tag = None
+        self._table_depth = 0  # how deep we are inside the requested table
+        self._nested = 0  # tables opened inside the row being read
+        self._skip = 0  # open <script> and <style> tags
+        self._row = None  # (text parts, cells, links, destination list) of the row being read
+        self._cell = None  # text parts of the cell being read
+
+    def _close_cell(self):
+        if self._row is not None and self._cell is not None:
+            self._row[1].append(_clean(''.join(self._cell)))
+            self._row[0].append(' ')
+        self._cell = None
+
+    def _close_row(self):
+        self._close_cell()
+        if self._row is not None:
+            text, cells, links, dest = self._row
+            dest.append(Row(text=_clean(''.join(text)), cells=cells, links=links))
+        self._row = None
+        self._nested = 0
+
+    def start(self, tag, attrs):
+        if tag in _skipped_tags:
+            self._skip += 1
+            return
+
+        if self._row is not None and tag == 'table':
+            self._nested += 1
+        if self._nested:
+            if tag == 'a':
+                self._link(attrs)
+            return
+
+        if self._table_depth and tag == self._table_tag:
+            self._table_depth += 1
+        elif self.table_id is not None and attrs.get('id') == self.table_id and not self.found_table:
+            self.found_table = True
+            self._table_tag = tag
+            self._table_depth = 1
+
+        if tag == 'tr':
+            self._close_row()
+
+            dest = None
+            if self._table_depth:
+                dest = self.table_rows
+            else:
+                classes = (attrs.get('class') or '').split()
+                dest = next((self.rows[cls] for cls in self.classes if cls in classes), None)
+
+            if dest is not None:
+                self._row = ([], [], [], dest)
+        elif tag in ('td', 'th') and self._row is not None:
+            self._close_cell()
+            self._row[0].append(' ')
+            if tag == 'td':
+                self._cell = []
+                self._row[2].append(None)
+        elif tag == 'a':
+            self._link(attrs)
+
+    def _link(self, attrs):
+        if self._cell is not None and self._row[2][-1] is None:
+            self._row[2][-1] = attrs.get('href')
+
+    def end(self, tag):
+        if tag in _skipped_tags:
+            self._skip = max(0, self._skip - 1)
+            return
+
+        if self._nested:
+            if tag == 'table':
+                self._nested -= 1
+            return
+
+        if tag in ('td', 'th'):
+            self._close_cell()
+        elif tag == 'tr':
+            self._close_row()
+
+        if self._table_depth and tag == self._table_tag:
+            self._close_row()
+            self._table_depth -= 1
+
+    def data(self, text):
+        if self._row is None or self._skip or not text:
+            return
+
+        self._row[0].append(text)
+        if self._cell is not None:
+            self._cell.append(text)
+
+    def close(self):
+        self._close_row()
+
+    def result(self):
+        """The rows we were asked for: the table's rows, or the class rows ordered by class first."""
+        if self.table_id is not None:
+            return self.table_rows if self.found_table else None
+
+        rows = []
+        for cls in self.classes:
+            rows += self.rows[cls]
+
+        return rows
+
+
+class SoupParser(StatsParser):
+    """Reference backend, builds a full BeautifulSoup tree."""
+    name = 'bs4'
+
+    @classmethod
+    def _walk(cls, tag, builder):
+        attrs = {key: ' '.join(value) if isinstance(value, list) else value for key, value in tag.attrs.items()}
+        builder.start(tag.name, attrs)
+
+        for child in tag.children:
+            if isinstance(child, Tag):
+                cls._walk(child, builder)
+            elif isinstance(child, NavigableString) and not isinstance(child, PreformattedString):
+                # comments, doctypes and the like are preformatted strings, they're not text
+                builder.data(str(child))
+
+        builder.end(tag.name)
+
+    def table_rows(self, text, table_id):
+        soup = BeautifulSoup(text, 'html.parser')
+
+        table = soup.find(id=table_id)
+        if table is None:
+            return None
+
+        builder = _RowBuilder(table_id=table_id)
+        self._walk(table, builder)
+        builder.close()
+
+        return builder.result()
+
+    def class_rows(self, text, classes):
+        soup = BeautifulSoup(text, 'html.parser')
+
+        builder = _RowBuilder(classes=classes)
+        for child in soup.children:
+            if isinstance(child, Tag):
+                self._walk(child, builder)
+        builder.close()
+
+        return builder.result()
+
+
+class LxmlParser(StatsParser):
+    """Backend using lxml's C parser. Only available if lxml is installed."""
+    name = 'lxml'
+
+    @classmethod
+    def _walk(cls, element, builder):
+        if isinstance(element.tag, str):
+            builder.start(element.tag, dict(element.attrib))
+            builder.data(element.text)
+            for child in element:
+                cls._walk(child, builder)
+            builder.end(element.tag)
+
+        # comments and processing instructions only contribute their tail
+        builder.data(element.tail)
+
+    def table_rows(self, text, table_id):
+        tree = lxml.html.fromstring(text)
+
+        tables = tree.xpath('//*[@id=$table_id]', table_id=table_id)
+        if not tables:
+            return None
+
+        builder = _RowBuilder(table_id=table_id)
+        self._walk(tables[0], builder)
+        builder.close()
+
+        return builder.result()
+
+    def class_rows(self, text, classes):
+        tree = lxml.html.fromstring(text)
+
+        builder = _RowBuilder(classes=classes)
+        self._walk(tree.getroottree().getroot(), builder)
+        builder.close()
+
+        return builder.result()
+
+
+class _RowExtractor(HTMLParser):
+    """Streams through a page and hands every tag and piece of text to a _RowBuilder."""
+
+    def __init__(self, builder):
+        super().__init__()
+
+        self.builder = builder
+
+    def handle_starttag(self, tag, attrs):
+        self.builder.start(tag, {key: value or '' for key, value in attrs})
+
+    def handle_endtag(self, tag):
+        self.builder.end(tag)
+
+    def handle_data(self, data):
+        self.builder.data(data)
+
+    def close(self):
+        super().close()
+        self.builder.close()
+
+
+class TableParser(StatsParser):
+    """Hand-written extractor on top of the stdlib tokenizer. Never builds a tree."""
+    name = 'table'
+
+    @staticmethod
+    def _extract(text, builder):
+        extractor = _RowExtractor(builder)
+        extractor.feed(text)
+        extractor.close()
+
+        return builder.result()
+
+    def table_rows(self, text, table_id):
+        return self._extract(text, _RowBuilder(table_id=table_id))
+
+    def class_rows(self, text, classes):
+        return self._extract(text, _RowBuilder(classes=classes))
+
+
+PARSERS = {
+    SoupParser.name: SoupParser,
+    LxmlParser.name: LxmlParser,
+    TableParser.name: TableParser
+}
+
+
+def available_parsers():
+    """Names of all parser backends that can be used in this environment."""
+    return [name for name in PARSERS if name != LxmlParser.name or lxml is not None]
+
+
+def get_parser(name='auto'):
+    """
+    Returns an instance of the requested parser backend.
+    'auto' picks the fastest backend that is available: lxml if it's installed, table otherwise.
+    They all produce the same rows, tests/test_parsers.py keeps it that way.
+    :param name: str
+    :return: StatsParser
+    """
+    if name == 'auto':
+        name = LxmlParser.name if lxml is not None else TableParser.name
+
+    if name not in available_parsers():
+        logging.warning(f'HTML parser "{name}" is not available, falling back to {SoupParser.name}')
+        name = SoupParser.name
+
+    return PARSERS[name]()
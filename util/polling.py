@@ -0,0 +1,156 @@
+import asyncio
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logging.getLogger(__name__)
+
+default_concurrency = 4
+
+
+class PollEngine:
+    """
+    Runs the fetches of a poll cycle concurrently.
+
+    `fetch` is a blocking callable taking a single key (usually a game ID).
+    Fetches are scheduled on an asyncio event loop owned by the calling thread
+    and executed in a small thread pool, with at most `concurrency` in flight.
+    """
+
+    def __init__(self, fetch, concurrency=default_concurrency):
+        self.fetch = fetch
+        self.concurrency = max(1, concurrency)
+
+        self._loop = None
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='PollWorker')
+
+    async def _fetch_one(self, semaphore, fetch, key):
+        async with semaphore:
+            result = await self._loop.run_in_executor(self._executor, fetch, key)
+
+        return key, result
+
+    async def _fetch_all(self, fetch, keys):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._fetch_one(semaphore, fetch, key) for key in keys))
+
+        return dict(results)
+
+    def fetch_all(self, keys, fetch=None):
+        """
+        Fetches all keys and blocks until every fetch is done.
+        :param keys: iterable of keys to pass to the fetch callable
+        :param fetch: callable to use instead of the engine's default, optional
+        :return: dict - {key: result}
+        """
+        if self._loop is None:
+            # created lazily, so the loop belongs to the thread that polls
+            self._loop = asyncio.new_event_loop()
+
+        return self._loop.run_until_complete(self._fetch_all(fetch or self.fetch, list(keys)))
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+
+
+class PollScheduler:
+    """
+    Keeps a separate next-due time for every game we watch.
+
+    Games are kept in a priority queue ordered by due time. After every poll,
+    the game reports back and its interval is adapted:
+    - its state changed or a watched player is online: poll again at `min_interval`
+    - nothing happened: back off by `step`, up to `max_interval`
+    - the poll failed: double the interval, up to `max_interval`
+
+    Reports may come in from several poll workers at once.
+    """
+
+    def __init__(self, min_interval, max_interval, step):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.step = step
+
+        self._queue = []  # heap of (due, game_id), may contain outdated entries
+        self._due = dict()  # game_id: due time, the source of truth for the queue
+        self._intervals = dict()
+        self._states = dict()
+        self._lock = threading.Lock()
+
+    def _schedule(self, game_id, due):
+        self._due[game_id] = due
+        heapq.heappush(self._queue, (due, game_id))
+
+    def sync(self, game_ids):
+        """Adds new games (due immediately) and forgets games we no longer watch."""
+        with self._lock:
+            now = time.monotonic()
+            for game_id in game_ids:
+                if game_id not in self._due:
+                    self._intervals[game_id] = self.min_interval
+                    self._schedule(game_id, now)
+
+            for game_id in set(self._due) - set(game_ids):
+                del self._due[game_id]
+                self._intervals.pop(game_id, None)
+                self._states.pop(game_id, None)
+
+            # drop outdated queue entries, so the heap doesn't grow forever
+            self._queue = [(due, game_id) for due, game_id in self._queue if self._due.get(game_id) == due]
+            heapq.heapify(self._queue)
+
+    def is_due(self, game_id, now=None):
+        with self._lock:
+            now = now if now is not None else time.monotonic()
+            return self._due.get(game_id, now) <= now
+
+    def next_due(self):
+        """Seconds until the next game is due. Returns `min_interval` if we don't watch anything."""
+        with self._lock:
+            while self._queue:
+                due, game_id = self._queue[0]
+                if self._due.get(game_id) != due:  # outdated entry
+                    heapq.heappop(self._queue)
+                    continue
+
+                return max(0, due - time.monotonic())
+
+            return self.min_interval
+
+    def defer(self, game_id, delay):
+        """Postpones a due game without touching its interval."""
+        with self._lock:
+            self._schedule(game_id, time.monotonic() + delay)
+
+    def report(self, game_id, state=None, active=False, error=False):
+        """
+        Reschedules a game after it has been polled.
+        :param game_id: str
+        :param state: any comparable value describing what we saw, used to detect changes
+        :param active: whether a watched player is online in this game
+        :param error: whether the poll failed
+        :return: float - the new interval
+        """
+        with self._lock:
+            interval = self._intervals.get(game_id, self.min_interval)
+
+            if error:
+                interval = min(interval * 2, self.max_interval)
+            else:
+                changed = self._states.get(game_id) != state
+                self._states[game_id] = state
+
+                if changed or active:
+                    interval = self.min_interval
+                else:
+                    interval = min(interval + self.step, self.max_interval)
+
+            self._intervals[game_id] = interval
+            self._schedule(game_id, time.monotonic() + interval)
+
+            return interval
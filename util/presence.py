@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import threading
+import time
+
+import pypresence
+from PyQt5 import QtCore as Qc
+
+from .threading import Thread
+
+logging.getLogger(__name__)
+
+# Discord allows roughly 5 presence updates per 20 seconds
+update_burst = 5
+update_period = 20
+
+reconnect_min_delay = 2
+reconnect_max_delay = 60
+
+discord_errors = (pypresence.PyPresenceException, OSError, asyncio.TimeoutError)
+# Discord is there, but refused what we sent. Reconnecting won't change its mind.
+rejected_errors = (pypresence.ServerError, pypresence.DiscordError, pypresence.InvalidArgument)
+
+
+class TokenBucket:
+    """Classic token bucket, refilling `capacity` tokens every `period` seconds."""
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period
+
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self):
+        """Takes a token. Returns False if there are none left."""
+        self._refill()
+        if self._tokens < 1:
+            return False
+
+        self._tokens -= 1
+        return True
+
+    def wait_time(self):
+        """Seconds until the next token is available."""
+        self._refill()
+        return max(0, (1 - self._tokens) / self.rate)
+
+
+class DiscordPresenceThread(Thread):
+    """
+    Talks to the Discord client over IPC, without ever blocking its callers.
+
+    update() and clear() only store the latest state locally; this thread sends it
+    whenever it is connected. If Discord is not running or goes away, we keep retrying
+    with exponential backoff and replay the latest state once we're back.
+    """
+    friendly_progress = ''
+    permanent = True
+    name = 'DiscordPresenceThread'
+
+    availability_changed = Qc.pyqtSignal(bool)
+
+    def __init__(self, config, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.client_id = config.preferences['rpc']['oauth_id']
+        self.client = None
+        self.available = None  # whether Discord could be reached last time, None until we tried
+
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._state = None  # presence options, None means cleared
+        self._version = 0
+
+    @property
+    def connected(self):
+        return self.client is not None
+
+    def update(self, **options):
+        self._set_state(options)
+
+    def clear(self):
+        self._set_state(None)
+
+    def _set_state(self, state):
+        with self._lock:
+            self._state = state
+            self._version += 1
+        self._changed.set()
+
+    def _set_available(self, available):
+        if available == self.available:
+            return
+
+        self.available = available
+        self.availability_changed.emit(available)
+
+    def _connect(self):
+        # pypresence runs on asyncio, give it a loop that belongs to this thread
+        client = pypresence.Presence(self.client_id, loop=asyncio.new_event_loop())
+        client.connect()
+
+        self.client = client
+
+    def _send(self, state):
+        if state is None:
+            self.client.clear()
+        else:
+            self.client.update(**state)
+
+    def execute(self):
+        delay = reconnect_min_delay
+        sent_version = 0
+
+        while True:
+            if self.client is None:
+                try:
+                    self._connect()
+                except discord_errors as e:
+                    # only tell the user when things change, not on every retry
+                    level = logging.WARNING if self.available is not False else logging.DEBUG
+                    self.log(level, f'Discord is not available ({e!r}), retrying in {delay}s')
+                    self._set_available(False)
+
+                    time.sleep(delay)
+                    delay = min(delay * 2, reconnect_max_delay)
+                    continue
+
+                self.log(logging.INFO, 'Connected to Discord')
+                self._set_available(True)
+                delay = reconnect_min_delay
+                sent_version = None  # replay whatever we have
+
+            self._changed.clear()
+            with self._lock:
+                version, state = self._version, self._state
+
+            if version == sent_version:
+                self._changed.wait()
+                continue
+
+            try:
+                self._send(state)
+            except rejected_errors as e:
+                # the connection is fine, sending the same state again would fail the same way
+                self.log(logging.WARNING, f'Discord rejected the presence update ({e!r}), dropping it')
+            except discord_errors as e:
+                self.log(logging.WARNING, f'Lost connection to Discord ({e!r}), reconnecting...')
+                self.client = None
+                continue
+
+            sent_version = version
+
+
+class PresencePipeline:
+    """
+    Sits between the check loop and the Discord client.
+
+    Updates identical to what Discord already shows are dropped. Everything else
+    goes through a token bucket; when it runs dry, updates are coalesced and only
+    the latest state is sent once a token is available again.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+        self.stats = {'sent': 0, 'suppressed': 0, 'coalesced': 0}
+
+        self._lock = threading.Lock()
+        self._bucket = TokenBucket(update_burst, update_period)
+        self._sent = None  # fingerprint of what Discord shows right now
+        self._pending = None  # (fingerprint, options) waiting for a token
+        self._timer = None
+
+    @staticmethod
+    def _fingerprint(options):
+        if options is None:
+            return None
+
+        return tuple(sorted((key, tuple(value) if isinstance(value, list) else value)
+                            for key, value in options.items()))
+
+    def update(self, options):
+        """Shows `options` on Discord, eventually. None clears the presence."""
+        fingerprint = self._fingerprint(options)
+
+        with self._lock:
+            if self._pending is not None:
+                self.stats['coalesced'] += 1
+                self._pending = None
+
+            if fingerprint == self._sent:
+                self.stats['suppressed'] += 1
+                return
+
+            if not self._bucket.take():
+                self._pending = (fingerprint, options)
+                if self._timer is None:
+                    self._timer = threading.Timer(self._bucket.wait_time(), self._flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+
+            self._send(fingerprint, options)
+
+    def clear(self):
+        self.update(None)
+
+    def _send(self, fingerprint, options):
+        if options is None:
+            self.client.clear()
+        else:
+            self.client.update(**options)
+
+        self._sent = fingerprint
+        self.stats['sent'] += 1
+
+    def _flush(self):
+        with self._lock:
+            self._timer = None
+            if self._pending is None:
+                return
+
+            fingerprint, options = self._pending
+            self._pending = None
+
+            if fingerprint == self._sent:
+                self.stats['suppressed'] += 1
+            elif self._bucket.take():
+                self._send(fingerprint, options)
+            else:  # woke up too early, try again later
+                self._pending = (fingerprint, options)
+                self._timer = threading.Timer(self._bucket.wait_time(), self._flush)
+                self._timer.daemon = True
+                self._timer.start()
@@ -0,0 +1,239 @@
+import hashlib
+import json
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logging.getLogger(__name__)
+
+cache_path = Path(sys.argv[0]).parent / 'data' / 'cache' / 'http'
+
+user_agent = 'wiimmfi-rpc by DismissedGuy#2118 - github.com/DismissedGuy/wiimmfi-rpc'
+pool_size = 10  # kept-alive connections per host
+default_timeout = 15
+cache_max_size = 8 * 1024 * 1024  # bytes of response bodies to keep on disk
+
+
+class ResponseCache:
+    """
+    Stores response bodies together with their validators (ETag/Last-Modified),
+    so we can make conditional requests and serve 304 responses from disk.
+
+    Every entry consists of a `<key>.json` metadata file and a `<key>.body` file.
+    When the bodies grow beyond `max_size`, the least recently used entries are evicted.
+    Cache hits only update the last use in memory, it's written out on the next
+    store() or flush().
+    """
+
+    def __init__(self, path, max_size=cache_max_size):
+        self.path = path
+        self.max_size = max_size
+
+        self._lock = threading.Lock()
+        self._entries = None  # loaded lazily from disk
+        self._touched = set()  # keys whose last use changed since we last wrote their metadata
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha1(url.encode()).hexdigest()
+
+    def _load(self):
+        if self._entries is not None:
+            return
+
+        self._entries = dict()
+        if not self.path.is_dir():
+            return
+
+        for meta_path in self.path.glob('*.json'):
+            try:
+                with meta_path.open('r') as file:
+                    self._entries[meta_path.stem] = json.load(file)
+            except (json.JSONDecodeError, OSError):
+                meta_path.unlink()
+
+        # bodies without metadata are left behind by a crash in the middle of store()
+        for body_path in self.path.glob('*.body'):
+            if body_path.stem not in self._entries:
+                try:
+                    body_path.unlink()
+                except OSError:
+                    pass
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        self._touched.discard(key)
+        for suffix in ('.json', '.body'):
+            try:
+                (self.path / (key + suffix)).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        total = sum(entry['size'] for entry in self._entries.values())
+        for key, entry in sorted(self._entries.items(), key=lambda e: e[1]['used']):
+            if total <= self.max_size:
+                break
+
+            total -= entry['size']
+            self._remove(key)
+
+    def _write_meta(self, key, entry):
+        with (self.path / f'{key}.json').open('w+') as file:
+            json.dump(entry, file)
+        self._touched.discard(key)
+
+    def _write_touched(self):
+        for key in list(self._touched):
+            self._write_meta(key, self._entries[key])
+
+    def flush(self):
+        """Writes out the last use of every entry that was hit since the last write."""
+        with self._lock:
+            if self._entries is not None:
+                self._write_touched()
+
+    def validators(self, url):
+        """Returns the conditional request headers for `url`."""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(self._key(url))
+
+        headers = dict()
+        if entry is None:
+            return headers
+
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        return headers
+
+    def load(self, url, resp):
+        """Fills a 304 response with the stored body. Returns False if we don't have one."""
+        key = self._key(url)
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+
+            try:
+                body = (self.path / f'{key}.body').read_bytes()
+            except FileNotFoundError:
+                self._remove(key)
+                return False
+
+            entry['used'] = time.time()
+            self._touched.add(key)
+
+        resp._content = body
+        resp.status_code = 200
+        resp.encoding = entry.get('encoding')
+        if entry.get('content_type'):
+            resp.headers['Content-Type'] = entry['content_type']
+
+        return True
+
+    def store(self, url, resp):
+        """Stores a response, as long as it has something to validate against."""
+        etag = resp.headers.get('ETag')
+        last_modified = resp.headers.get('Last-Modified')
+        if not (etag or last_modified):
+            return
+
+        key = self._key(url)
+        entry = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_type': resp.headers.get('Content-Type'),
+            'encoding': resp.encoding,
+            'size': len(resp.content),
+            'used': time.time()
+        }
+
+        with self._lock:
+            self._load()
+            self.path.mkdir(parents=True, exist_ok=True)
+
+            (self.path / f'{key}.body').write_bytes(resp.content)
+            self._write_meta(key, entry)
+            self._entries[key] = entry
+
+            self._evict()
+            self._write_touched()
+
+
+class HTTPSession(requests.Session):
+    """
+    Process-wide HTTP session.
+
+    Keeps connections alive in a pool per host, so we don't
+    have to do a TCP and TLS handshake on every request.
+    All outbound requests should go through `http_session`.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+        self.headers['User-Agent'] = user_agent
+
+        self._adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount('https://', self._adapter)
+        self.mount('http://', self._adapter)
+
+        self.cache = ResponseCache(cache_path)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', default_timeout)
+
+        return super().request(method, url, **kwargs)
+
+    def get_cached(self, url, **kwargs):
+        """
+        GET request that revalidates against the response cache.
+        A 304 is served from the cached body and looks like a regular 200 to the caller,
+        with `from_cache` set to True.
+        """
+        headers = kwargs.pop('headers', None) or {}
+
+        resp = self.get(url, headers={**self.cache.validators(url), **headers}, **kwargs)
+        resp.from_cache = False
+
+        if resp.status_code == 304:
+            resp.from_cache = self.cache.load(url, resp)
+            if not resp.from_cache:  # body got evicted in the meantime, ask for the full page
+                resp = self.get(url, headers=headers, **kwargs)
+                resp.from_cache = False
+
+        if resp.status_code == 200 and not resp.from_cache:
+            self.cache.store(url, resp)
+
+        return resp
+
+    def connection_stats(self):
+        """
+        Counts how many connections were opened and how many requests reused one.
+        :return: tuple - (opened: int, reused: int)
+        """
+        opened = 0
+        requests_made = 0
+        for key in self._adapter.poolmanager.pools.keys():
+            pool = self._adapter.poolmanager.pools.get(key)
+            if pool is None:  # evicted in the meantime
+                continue
+
+            opened += pool.num_connections
+            requests_made += pool.num_requests
+
+        return opened, max(requests_made - opened, 0)
+
+
+http_session = HTTPSession()
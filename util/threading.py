@@ -22,7 +22,7 @@ class ThreadSignals(Qc.QObject):
     message: msg
     - Update thread status
     log: tuple
-    - (level: int, msg: str)
+    - (thread_name: str, level: int, msg: str)
     data: object
     - Send any result back. This is not handled by the ThreadManager,
       but should instead be connected to manually.
@@ -109,8 +109,9 @@ class Thread(Qc.QThread):
     def emit_data(self, data):
         self.signals.data.emit(data)
 
-    def log(self, *payload):
-        self.signals.log.emit(payload)
+    def log(self, level: int, msg: str):
+        # the record is created on the main thread, so we send along who it's really from
+        self.signals.log.emit((self.objectName(), level, msg))
 
 
 class ThreadManager:
@@ -228,4 +229,12 @@ class ThreadManager:
         self.thread_status.setText(msg)
 
     def _on_thread_log(self, payload: tuple):
-        logging.log(*payload)
+        thread_name, level, msg = payload
+
+        logger = logging.getLogger()
+        if not logger.isEnabledFor(level):
+            return
+
+        record = logger.makeRecord(logger.name, level, __file__, 0, msg, None, None)
+        record.threadName = thread_name
+        logger.handle(record)
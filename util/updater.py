@@ -13,6 +13,7 @@ from PyQt5 import QtCore as Qc
 
 from . import checks
 from .msgboxes import MsgBoxes
+from .session import http_session
 from .threading import Thread
 
 logging.getLogger(__name__)
@@ -147,7 +148,7 @@ class UpdateCheckThread(Thread):
 
         url = f'https://api.github.com/repos/{self.github_user}/{self.repo}/contents/' \
               f'data/version_info.json?ref={ref}'
-        resp = requests.request('GET', url, headers=github_headers)
+        resp = http_session.get_cached(url, headers=github_headers)
 
         try:
             resp.raise_for_status()
@@ -193,7 +194,7 @@ class UpdateDownloadThread(Thread):
 
     def download_latest_experimental(self):
         url = f'https://api.github.com/repos/{self.github_user}/{self.repo}/zipball/prerelease'
-        resp = requests.get(url, headers=github_headers)
+        resp = http_session.get(url, headers=github_headers)
 
         try:
             resp.raise_for_status()
@@ -206,7 +207,7 @@ class UpdateDownloadThread(Thread):
 
     def download_latest_release(self):
         url = f'https://api.github.com/repos/{self.github_user}/{self.repo}/releases/latest'
-        resp = requests.get(url)
+        resp = http_session.get(url)
 
         try:
             resp.raise_for_status()
@@ -230,7 +231,7 @@ class UpdateDownloadThread(Thread):
             size = asset['size']
             zip_url = asset['browser_download_url']
 
-        resp = requests.get(zip_url, stream=True)
+        resp = http_session.get(zip_url, stream=True)
         try:
             resp.raise_for_status()
         except requests.RequestException:
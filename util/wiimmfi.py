@@ -1,16 +1,20 @@
+import copy
+import hashlib
 import json
 import logging
 import sys
+import threading
 import time
 from datetime import datetime, timedelta
 from pathlib import Path
 
-import pypresence
 import requests
 from PyQt5 import QtCore as Qc
-from bs4 import BeautifulSoup
 
-from .msgboxes import MsgBoxes
+from .parsers import get_parser
+from .polling import PollEngine, PollScheduler, default_concurrency
+from .presence import PresencePipeline
+from .session import http_session
 from .threading import Thread
 
 game_info_base_url = 'https://wiimmfi.de/stats/game/{game_id}'
@@ -22,6 +26,13 @@ asset_base_url = 'https://cdn.discordapp.com/app-assets/{app_id}/{asset_id}.png'
 
 cache_path = Path(sys.argv[0]).parent / 'data' / 'cache'
 
+active_games_ttl = 30  # seconds the active game list is reused for
+background_refresh_interval = 60  # seconds after which games skipped by the priority scan are fetched anyway
+mkw_race_duration = 150  # rough upper bound of a race, in seconds
+mkw_lobby_ttl = 10  # seconds room info is cached while no race is running
+metrics_log_interval = 5 * 60  # seconds between the poll metric summaries in the log
+history_failure_limit = 3  # failed fetches in a row after which we end a game's sessions in the history
+
 
 class WiimmfiPlayer:
     def __init__(self, **kwargs):
@@ -47,27 +58,24 @@ class WiimmfiPlayer:
             return self.friend_code == other.friend_code
         return False
 
-    def set_mkw_info(self):
+    def set_mkw_info(self, rooms):
+        """
+        Fills in the Mario Kart Wii room info of this player.
+        :param rooms: MkwRoomCache
+        """
         if self.game_id != 'RMCJ':
             self.is_mkw = False
             return
 
-        headers = {
-            'User-Agent': 'wiimmfi-rpc by DismissedGuy#2118 - github.com/DismissedGuy/wiimmfi-rpc'
-        }
-        resp = requests.get(mkw_room_info_base_url.format(pid=self.pid), headers=headers)
-        resp.raise_for_status()
-        data = resp.json()
-
-        race_start = data[1].get('race_start')
-        if not race_start:
+        room = rooms.get(self.pid)
+        if room is None or not room.race_start:
             # race hasn't started yet or room is offline
             self.is_mkw = False
             return
-        self.start = race_start
-        self.n_members = data[1]['n_members']
-        self.n_players = data[1]['n_players']
-        self.track_name = data[1]['track'][1]
+        self.start = room.race_start
+        self.n_members = room.n_members
+        self.n_players = room.n_players
+        self.track_name = room.track_name
 
         self.is_mkw = True
 
@@ -97,42 +105,216 @@ class WiimmfiPlayer:
         return options
 
 
+class MkwRoom:
+    """Snapshot of a Mario Kart Wii room."""
+
+    def __init__(self, data):
+        room = data[1]
+
+        self.room_id = room.get('room_id')
+        self.race_start: int = room.get('race_start')
+        self.n_members: int = room.get('n_members', 0)
+        self.n_players: int = room.get('n_players', 12)
+        self.track_name: str = (room.get('track') or [None, ''])[1]
+        self.members: list = room.get('members') or []
+
+        self.expires = time.time() + self._ttl()
+
+    def _ttl(self):
+        if not self.race_start:
+            return mkw_lobby_ttl
+
+        # nothing changes until the race is over, so come back right before it should end
+        race_end = self.race_start + mkw_race_duration - time.time()
+        return max(race_end, mkw_lobby_ttl)
+
+    @property
+    def expired(self):
+        return time.time() >= self.expires
+
+    @property
+    def member_pids(self):
+        return {str(member.get('pid')) for member in self.members if member.get('pid') is not None}
+
+
+class MkwRoomCache:
+    """
+    Caches Mario Kart Wii room info by room, for as long as its race runs.
+
+    Every member of a cached room is served from the same entry, and concurrent
+    requests for the same PID are collapsed into a single fetch.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rooms = dict()  # room key: MkwRoom
+        self._room_keys = dict()  # pid: room key
+        self._in_flight = dict()  # pid: threading.Event
+
+    def _cached(self, pid):
+        return self._rooms.get(self._room_keys.get(pid))
+
+    def get(self, pid):
+        """
+        Returns the room `pid` is in, fetching it if our copy has expired.
+        :return: MkwRoom, or None if the room is offline
+        """
+        pid = str(pid)
+
+        with self._lock:
+            room = self._cached(pid)
+            if room is not None and not room.expired:
+                return room
+
+            event = self._in_flight.get(pid)
+            leader = event is None
+            if leader:
+                event = self._in_flight[pid] = threading.Event()
+
+        if not leader:
+            # someone else is already fetching this room, use their result
+            event.wait()
+            with self._lock:
+                return self._cached(pid)
+
+        try:
+            resp = http_session.get(mkw_room_info_base_url.format(pid=pid))
+            resp.raise_for_status()
+            data = resp.json()
+
+            room = MkwRoom(data) if len(data) > 1 else None
+            with self._lock:
+                self._store(pid, room)
+        finally:
+            with self._lock:
+                del self._in_flight[pid]
+            event.set()
+
+        return room
+
+    def _store(self, pid, room):
+        old_key = self._room_keys.pop(pid, None)
+        self._rooms.pop(old_key, None)
+        if room is None:
+            return
+
+        key = room.room_id or pid
+        self._rooms[key] = room
+        for member_pid in room.member_pids | {pid}:
+            self._room_keys[member_pid] = key
+
+        # forget rooms nobody points to anymore
+        referenced = set(self._room_keys.values())
+        for stale_key in set(self._rooms) - referenced:
+            del self._rooms[stale_key]
+
+
 class WiimmfiPlayerList:
+    """Players of a single game page, indexed by friend code and PID."""
+
     def __init__(self, players=None):
         self._players = []
-        self._p_index = 0
+        self._by_friend_code = dict()
+        self._by_pid = dict()
 
         if players is not None:
             self.add_players(players)
 
+    @classmethod
+    def from_rows(cls, game_name, rows, assets=None, friend_codes=None):
+        """
+        Builds a player list from the player rows of a game page.
+        :param game_name: str
+        :param rows: list of Row, without the header rows
+        :param assets: AssetIndex used to check for game art, optional
+        :param friend_codes: set of friend codes. If given, only these players are
+                             built and we stop scanning once all of them are found.
+        :return: WiimmfiPlayerList
+        """
+        start = int(datetime.now().timestamp())
+
+        remaining = set(friend_codes) if friend_codes is not None else None
+
+        players = []
+        for row in rows:
+            if remaining is not None and not remaining:
+                break  # found everyone we were looking for
+
+            data = row.cells
+            if remaining is not None:
+                if data[2] not in remaining:
+                    continue
+                remaining.discard(data[2])
+
+            player_2 = data[11]
+            if player_2 == '\u2014':
+                # "em dash" means no player 2
+                player_2 = ''
+
+            player = WiimmfiPlayer(game_name=game_name,
+                                   game_id=data[0],
+                                   pid=data[1],
+                                   friend_code=data[2],
+                                   status=data[7],
+                                   player_1=data[10],
+                                   player_2=player_2,
+                                   start=start)
+            if assets is not None and player.game_id not in assets:
+                player.has_game_art = False
+
+            players.append(player)
+
+        return cls(players)
+
     def __len__(self):
         return len(self._players)
 
     def __iter__(self):
         return iter(self._players)
 
-    def __next__(self):
-        index = self._p_index
-        self._p_index += 1
+    def __contains__(self, friend_code):
+        return friend_code in self._by_friend_code
 
-        return index
+    def copy(self):
+        """Returns a new list with copies of our players."""
+        return WiimmfiPlayerList([copy.copy(player) for player in self._players])
 
     def add_player(self, player):
         if not isinstance(player, WiimmfiPlayer):
             raise ValueError('player arg must be instance of WiimmfiPlayer.')
 
         self._players.append(player)
+        self._by_friend_code[player.friend_code] = player
+        self._by_pid[str(player.pid)] = player
 
     def add_players(self, players):
         for player in players:
             self.add_player(player)
 
     def get_player(self, friend_code):
-        for player in self._players:
-            if player.friend_code == friend_code:
-                return player
+        return self._by_friend_code.get(friend_code)
+
+    def get_player_by_pid(self, pid):
+        return self._by_pid.get(str(pid))
+
 
-        return None
+class AssetIndex:
+    """Maps Discord asset names to their IDs. Names are case-insensitive."""
+
+    def __init__(self, assets=None):
+        self._ids = dict()
+
+        for asset in assets or []:
+            self._ids[asset.get('name').lower()] = asset.get('id')
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, name):
+        return name.lower() in self._ids
+
+    def get_id(self, name):
+        return self._ids.get(name.lower())
 
 
 class WiimmfiGame:
@@ -142,30 +324,89 @@ class WiimmfiGame:
         self.game_name = game_name
         self.online_players = online_players
 
+    @classmethod
+    def from_row(cls, row):
+        """
+        Builds a game from a row of the active game list.
+        :param row: Row
+        :return: WiimmfiGame
+        """
+        return cls(console=row.cells[0],
+                   game_name=row.cells[1],
+                   game_id=row.links[1].split('/')[-1],  # strip url part
+                   online_players=int(row.cells[4]))
+
+
+def page_fingerprint(content):
+    """
+    Hashes a whole page. Slicing out just the table isn't reliable, since player rows
+    contain nested tables and the markup may mention the table id more than once.
+    :param content: bytes
+    """
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+class PresenceState:
+    """
+    Immutable snapshot of what we're showing on Discord, published by WiimmfiCheckThread.
+    Every change bumps `version`. `player` is a copy and None if we're not playing anything.
+    """
+
+    def __init__(self, version=0, player=None):
+        self.version = version
+        self.player = player
+
+    @staticmethod
+    def key(player):
+        """Everything about a player that can end up on screen."""
+        if player is None:
+            return None
+        return tuple(sorted(vars(player).items()))
+
 
 class WiimmfiCheckThread(Thread):
     friendly_progress = ''
     permanent = True
     name = 'WiimmfiCheckThread'
 
-    def __init__(self, config, status_callback=None):
+    state_changed = Qc.pyqtSignal(PresenceState)
+    status_changed = Qc.pyqtSignal(str)
+
+    def __init__(self, config, presence, history=None):
         super().__init__()
 
         self.config = config
-        self.status_callback = status_callback
+        self.presence = presence
+        self.history = history
+        self.presence_pipeline = PresencePipeline(presence)
+        self._status = None
 
-        self.timeout_backoff = 0
         self.last_player = None
+        self.state = PresenceState()
+        self._state_key = None
         self.run = True
-        self.assets = None
-
-        try:
-            self.presence = pypresence.Presence(self.config.preferences['rpc']['oauth_id'])
-            self.presence.connect()
-        except (pypresence.PyPresenceException, ConnectionRefusedError):
-            MsgBoxes.warn('It appears that your Discord client is not accepting requests. \n'
-                          'Please try restarting it and then run this program again.')
-            sys.exit()
+        self.assets = AssetIndex()
+        self.parsed_pages = dict()  # game_id: (fingerprint, friend codes or None if complete, WiimmfiPlayerList)
+        self.parse_stats = {'parsed': 0, 'skipped': 0}
+        self.requests_saved = 0
+        self._metrics_logged = None
+        self._parse_lock = threading.Lock()
+        self._active_game_ids = None
+        self._active_games_fetched = None  # monotonic time, None until the first fetch
+        self._games_fetched = dict()  # game_id: monotonic time of the last fetch, missing if never fetched
+        self._fetch_failures = dict()  # game_id: failed fetches in a row
+        self.parser = get_parser(self.config.preferences['rpc'].get('html_parser', 'auto'))
+        logging.info(f'Using HTML parser: {self.parser.name}')
+
+        concurrency = self.config.preferences['rpc'].get('poll_concurrency', default_concurrency)
+        self.poll_engine = PollEngine(self.get_online_players, concurrency)
+
+        rpc_preferences = self.config.preferences['rpc']
+        self.scheduler = PollScheduler(rpc_preferences['min_timeout'], rpc_preferences['max_timeout'],
+                                       rpc_preferences['timeout_backoff'])
+        self.game_results = dict()  # game_id: last known WiimmfiPlayerList
+        self.wake_event = threading.Event()
+        self.mkw_rooms = MkwRoomCache()
 
     def execute(self):
         self.assets = self.get_asset_list()
@@ -178,163 +419,348 @@ class WiimmfiCheckThread(Thread):
 
         while True:
             if not self.run:
-                time.sleep(1)
                 if self.last_player:
                     self.remove_presence()
                     self.last_player = None
 
-                self.status_callback()
+                self.update_status()
+                self.publish_state()
 
-                continue
+                if self.history is not None:
+                    # we won't see anyone leave while we're not looking
+                    self.history.end_sessions()
 
-            online = None
-            for code_entry in self.config.friend_codes:
-                console, game_id, friend_code, priority = code_entry.values()
+                # nothing to do until detection gets enabled again
+                self.wake_event.wait()
+                self.wake_event.clear()
 
-                online_players = self.get_online_players(game_id)
-                if online_players is None:
-                    continue
-
-                player = online_players.get_player(friend_code)
-                if player is None:
-                    continue
-                player.priority = priority
+                continue
 
-                if online is None or online.priority >= player.priority:
-                    online = player
+            online = self.check_friend_codes()
 
             if online is None:
                 self.remove_presence()
                 self.last_player = None
 
-                self.status_callback()
+                self.update_status()
             elif online != self.last_player:
                 self.last_player = online
                 self.save_game_art(self.last_player.game_id)
 
-                self.status_callback()
+                self.update_status()
 
                 self.log(logging.INFO, f'Now playing: {online.game_name}')
 
             if self.last_player:
                 if self.last_player.game_id == 'RMCJ':
-                    self.last_player.set_mkw_info()
+                    try:
+                        self.last_player.set_mkw_info(self.mkw_rooms)
+                    except requests.RequestException as e:
+                        self.log(logging.WARNING, f'Could not fetch room info: {e}')
                 self.set_presence(self.last_player)
 
-                self.status_callback()
+                self.update_status()
 
-            time.sleep(self.config.preferences['rpc']['min_timeout'] + self.timeout_backoff)
+            self.publish_state()
 
-    def get_online_players(self, game_id):
-        headers = {
-            'User-Agent': 'wiimmfi-rpc by DismissedGuy#2118 - github.com/DismissedGuy/wiimmfi-rpc'
-        }
-        resp = requests.get(game_info_base_url.format(game_id=game_id), headers=headers)
-        resp.raise_for_status()
+            # sleep until the next game is due, or until someone wakes us up
+            self.wake_event.wait(self.scheduler.next_due())
+            self.wake_event.clear()
 
-        soup = BeautifulSoup(resp.text, 'html.parser')
+    def update_status(self):
+        """Emits `status_changed` with 'disabled', 'active' or 'inactive', but only on transitions."""
+        if not self.run:
+            status = 'disabled'
+        elif self.last_player:
+            status = 'active'
+        else:
+            status = 'inactive'
+
+        game_id = self.last_player.game_id if self.last_player else None
+        if (status, game_id) == self._status:
+            return
+        self._status = (status, game_id)
+
+        self.status_changed.emit(status)
+
+    def publish_state(self):
+        """Publishes a new PresenceState, but only if anything visible changed."""
+        key = PresenceState.key(self.last_player)
+        if key == self._state_key:
+            return
+        self._state_key = key
+
+        player = copy.copy(self.last_player) if self.last_player is not None else None
+        self.state = PresenceState(self.state.version + 1, player)
+        self.state_changed.emit(self.state)
+
+    def plan_poll(self):
+        """Groups the friend code entries by game, so every game page only has to be fetched once."""
+        return self.config.friend_codes.by_game()
+
+    def check_friend_codes(self):
+        """Polls all games in our friend code list and returns the online player with the highest priority."""
+        plan = self.plan_poll()
+
+        n_entries = sum(len(entries) for entries in plan.values())
+        saved = n_entries - len(plan)
+        self.requests_saved += saved
+        if saved:
+            self.log(logging.DEBUG, f'Poll planner: {len(plan)} requests for {n_entries} friend codes '
+                                    f'({saved} saved)')
+
+        self.scheduler.sync(plan.keys())
+        for game_id in set(self.game_results) - set(plan):
+            del self.game_results[game_id]
+            self._fetch_failures.pop(game_id, None)
+            if self.history is not None:
+                self.history.record_poll(game_id, [])  # no longer watched, ends its sessions
+
+        idle = []
+        if plan and self.config.preferences['rpc'].get('poll_active_only', True):
+            # cheap first pass: only fetch the pages of games that have anyone online at all
+            active_game_ids = self.get_active_game_ids()
+            if active_game_ids is not None:
+                idle = [game_id for game_id in plan if game_id.upper() not in active_game_ids]
+            for game_id in idle:
+                del plan[game_id]
+                self.game_results[game_id] = None
+                if self.scheduler.is_due(game_id):
+                    self.scheduler.report(game_id, state=None)
+
+            if idle:
+                self.log(logging.DEBUG, f'Skipping {len(idle)} idle games: {", ".join(idle)}')
+
+        opened, reused = http_session.connection_stats()
+        self.log(logging.DEBUG, f'HTTP connections: {opened} opened, {reused} reused')
+
+        presence_stats = self.presence_pipeline.stats
+        self.log(logging.DEBUG, f'Presence updates: {presence_stats["sent"]} sent, '
+                                f'{presence_stats["suppressed"]} suppressed, {presence_stats["coalesced"]} coalesced')
+
+        parsed, skipped = self.parse_stats['parsed'], self.parse_stats['skipped']
+        if parsed + skipped:
+            self.log(logging.DEBUG, f'Page parses: {parsed} parsed, {skipped} skipped '
+                                    f'({skipped / (parsed + skipped):.0%})')
+
+        self.log_metrics()
+
+        wanted = {game_id: {entry.friend_code for entry in entries} for game_id, entries in plan.items()}
+        failed = set()
+
+        def fetch(game_id):
+            try:
+                players = self.get_online_players(game_id, wanted[game_id])
+            except requests.RequestException as e:
+                self.log(logging.WARNING, f'Could not fetch game {game_id}: {e}')
+                self.scheduler.report(game_id, error=True)
+                failed.add(game_id)
+                return self.game_results.get(game_id)
+
+            state = None
+            if players is not None:
+                state = tuple((p.friend_code, p.status, p.player_1, p.player_2) for p in players)
+            self.scheduler.report(game_id, state=state, active=bool(players))
+
+            return players
+
+        # scan the best priorities first, nobody in a later tier can beat a player we've found.
+        # Games that aren't due yet are judged on their last known result.
+        tiers = dict()
+        for game_id, entries in plan.items():
+            for code_entry in entries:
+                tier = tiers.setdefault(code_entry.priority, dict())
+                tier.setdefault(game_id, []).append(code_entry)
+
+        fetched = set()
+        online = None
+        for priority in sorted(tiers):
+            tier = tiers[priority]
+
+            due = [game_id for game_id in tier if game_id not in fetched and self.scheduler.is_due(game_id)]
+            self.game_results.update(self.poll_engine.fetch_all(due, fetch))
+            fetched.update(due)
+
+            for game_id, entries in tier.items():
+                online_players = self.game_results.get(game_id)
+                if online_players is None:
+                    continue
+
+                for code_entry in entries:
+                    player = online_players.get_player(code_entry.friend_code)
+                    if player is None:
+                        continue
+                    player.priority = code_entry.priority
+
+                    if online is None or online.priority >= player.priority:
+                        online = player
+
+            if online is not None:
+                break
+
+        # keep the skipped games somewhat fresh, so switching to them isn't delayed
+        now = time.monotonic()
+        skipped = [game_id for game_id in plan if game_id not in fetched and self.scheduler.is_due(game_id, now)]
+        # monotonic time has no fixed origin, a game we never fetched is always stale
+        stale = [game_id for game_id in skipped
+                 if game_id not in self._games_fetched
+                 or now - self._games_fetched[game_id] > background_refresh_interval]
+        if skipped:
+            self.log(logging.DEBUG, f'Priority scan skipped {len(skipped)} games, refreshing {len(stale)}')
+        if stale:
+            self.game_results.update(self.poll_engine.fetch_all(stale, fetch))
+            fetched.update(stale)
+        for game_id in set(skipped) - set(stale):
+            self.scheduler.defer(game_id, self._games_fetched[game_id] + background_refresh_interval - now)
+
+        for game_id in fetched:
+            self._games_fetched[game_id] = now
+
+        for game_id in fetched:
+            if game_id in failed:
+                self._fetch_failures[game_id] = self._fetch_failures.get(game_id, 0) + 1
+            else:
+                self._fetch_failures.pop(game_id, None)
+
+        if self.history is not None:
+            # after a few failures in a row we can't claim anyone is still online either
+            given_up = [game_id for game_id in failed if self._fetch_failures[game_id] == history_failure_limit]
+            self.record_history({game_id: wanted[game_id] for game_id in fetched - failed}, idle + given_up)
+
+        return online
+
+    def log_metrics(self):
+        """
+        Logs a summary of the poll metrics at INFO, at most every `metrics_log_interval` seconds.
+        The per-cycle numbers are only logged at DEBUG.
+        """
+        now = time.monotonic()
+        if self._metrics_logged is not None and now - self._metrics_logged < metrics_log_interval:
+            return
+        self._metrics_logged = now
+
+        opened, reused = http_session.connection_stats()
+        presence_stats = self.presence_pipeline.stats
+        parsed, skipped = self.parse_stats['parsed'], self.parse_stats['skipped']
+        skip_ratio = skipped / (parsed + skipped) if parsed + skipped else 0
+
+        self.log(logging.INFO, f'Poll metrics: {self.requests_saved} requests saved, '
+                               f'{opened} connections opened / {reused} reused, '
+                               f'{parsed} pages parsed / {skipped} skipped ({skip_ratio:.0%}), '
+                               f'{presence_stats["sent"]} presence updates sent / '
+                               f'{presence_stats["suppressed"]} suppressed / {presence_stats["coalesced"]} coalesced')
+
+    def record_history(self, fetched, idle):
+        """
+        Records the sightings of this poll. Only games we actually know the state of are recorded.
+        :param fetched: dict - {game_id: set of watched friend codes} of the games fetched successfully
+        :param idle: list of game IDs nobody is playing, or that we failed to fetch too often
+        """
+        seen = time.time()
+        for game_id in idle:
+            self.history.record_poll(game_id, [], seen)
+
+        for game_id, friend_codes in fetched.items():
+            online_players = self.game_results.get(game_id)
+            sightings = []
+            if online_players is not None:
+                for player in online_players:
+                    if player.friend_code not in friend_codes:
+                        continue
+                    sightings.append((player.friend_code, player.status, player.player_1, player.player_2))
+            self.history.record_poll(game_id, sightings, seen)
+
+    def get_online_players(self, game_id, friend_codes=None):
+        """
+        Retrieves the players of a game.
+        :param game_id: str
+        :param friend_codes: set of friend codes to look for. If omitted, every player is returned.
+        :return: WiimmfiPlayerList, or None if nobody is online
+        """
+        resp = http_session.get_cached(game_info_base_url.format(game_id=game_id))
+        resp.raise_for_status()
 
-        table = soup.find(id='online')
-        if not table:
+        # the table is often unchanged between polls, in which case we can reuse our last parse,
+        # as long as it contains every player we're looking for now.
+        fingerprint = page_fingerprint(resp.content)
+        last_fingerprint, last_codes, last_players = self.parsed_pages.get(game_id, (None, None, None))
+        with self._parse_lock:  # we may be called from several poll workers at once
+            if fingerprint == last_fingerprint and (last_codes is None
+                                                    or (friend_codes is not None and friend_codes <= last_codes)):
+                self.parse_stats['skipped'] += 1
+                return last_players.copy() if last_players is not None else None
+            self.parse_stats['parsed'] += 1
+
+        players = None
+        rows = self.parser.table_rows(resp.text, 'online')
+        if rows is None:
             self.log(logging.WARNING, f'Could not find game: {game_id}')
-            return None
-        elif not table.text:
+        elif not any(row.text for row in rows):
             self.log(logging.WARNING, f'No people found online for game: {game_id}')
-            return None
-
-        rows = table.find_all('tr')
-        game_name = rows[0].text
+        else:
+            game_name = rows[0].text
+            players = WiimmfiPlayerList.from_rows(game_name, rows[2:], self.assets, friend_codes)
 
-        players = WiimmfiPlayerList()
-        for row in rows[2:]:
-            data = [col.text for col in row.find_all('td')]
+        self.parsed_pages[game_id] = (fingerprint, friend_codes, players)
 
-            if data[11] == '\u2014':
-                # "em dash" means no player 2
-                data[11] = ''
+        # callers fill in priorities and room info, that must not end up in our cached parse
+        return players.copy() if players is not None else None
 
-            player = WiimmfiPlayer(game_name=game_name,
-                                   game_id=data[0],
-                                   pid=data[1],
-                                   friend_code=data[2],
-                                   status=data[7],
-                                   player_1=data[10],
-                                   player_2=data[11],
-                                   start=int(datetime.now().timestamp()))
-            if player.game_id.lower() not in [a.get('name').lower() for a in self.assets]:
-                player.has_game_art = False
+    def get_active_game_ids(self):
+        """
+        IDs of all games with online players, reused for `active_games_ttl` seconds.
+        Returns None if the list could not be fetched and we know nothing about activity.
+        """
+        now = time.monotonic()
+        if self._active_games_fetched is None or now - self._active_games_fetched > active_games_ttl:
+            try:
+                active_games = self.get_active_games()
+            except requests.RequestException as e:
+                self.log(logging.WARNING, f'Could not fetch active games: {e}')
+                return self._active_game_ids
 
-            players.add_player(player)
+            self._active_game_ids = {game.game_id.upper() for game in active_games if game.online_players > 0}
+            self._active_games_fetched = now
 
-        return players
+        return self._active_game_ids
 
     def get_active_games(self):
         """Retrieves games with online players"""
-        headers = {
-            'User-Agent': 'wiimmfi-rpc by DismissedGuy#2118 - github.com/DismissedGuy/wiimmfi-rpc'
-        }
-        resp = requests.get(active_game_list_url, headers=headers)
+        resp = http_session.get_cached(active_game_list_url)
         resp.raise_for_status()
 
-        soup = BeautifulSoup(resp.text, 'html.parser')
-
         # The game list HTML seems to be a little malformed, and it's messing with our parser.
         # Workaround: find all "tr0" and "tr1" classes (alternating game list colors) and concat them.
-        # We also unpack dicts here because "class" is a reserved keyword.
-        games_0 = soup.find_all(**{'class': 'tr0'})
-        games_1 = soup.find_all(**{'class': 'tr1'})
-
-        active_games_data = games_0 + games_1
+        active_games_data = self.parser.class_rows(resp.text, ('tr0', 'tr1'))
         if not active_games_data:
             self.log(logging.WARNING, 'No active games found.')
 
             return []
 
-        active_games = []
-        for game in active_games_data:
-            rows = game.find_all('td')
-
-            console = rows[0].text
-            game_name = rows[1].text
-            game_id = rows[1].a['href'].split('/')[-1]  # strip url part
-            online_players = int(rows[4].text)
-
-            game = WiimmfiGame(
-                console=console,
-                game_name=game_name,
-                game_id=game_id,
-                online_players=online_players
-            )
-            active_games.append(game)
-
-        return active_games
+        return [WiimmfiGame.from_row(row) for row in active_games_data]
 
     def get_asset_list(self):
         assets_url = asset_list_base_url.format(app_id=self.config.preferences['rpc']['oauth_id'])
 
-        resp = requests.get(assets_url)
+        resp = http_session.get(assets_url)
         resp.raise_for_status()
 
-        return resp.json()
+        # build the index before swapping it in, so readers never see a half-filled one
+        return AssetIndex(resp.json())
 
     def save_game_art(self, game_id):
         img_path = (cache_path / f'{game_id}.png')
         if img_path.exists():
             return
 
-        asset_id = None
-        for asset in self.assets:
-            if asset.get('name') == game_id.lower():
-                asset_id = asset.get('id')
-                break
-
+        asset_id = self.assets.get_id(game_id)
         if asset_id is None:
             self.log(logging.INFO, f'Could not find game art for game: {game_id}')
             return
 
         asset_url = asset_base_url.format(app_id=self.config.preferences['rpc']['oauth_id'], asset_id=asset_id)
 
-        resp = requests.get(asset_url)
+        resp = http_session.get(asset_url)
         resp.raise_for_status()
 
         with open(img_path, 'wb+') as file:
@@ -343,67 +769,25 @@ class WiimmfiCheckThread(Thread):
         self.log(logging.INFO, f'Downloaded art for game: {game_id}')
 
     def set_presence(self, player):
-        if self.timeout_backoff != 0:
-            self.timeout_backoff = 0
-
-            min_timeout = self.config.preferences['rpc']['min_timeout']
-            self.log(logging.INFO, f'Reverting timeout back to {min_timeout}')
-
-        self.presence.update(**player.presence_options(self.config))
+        self.presence_pipeline.update(player.presence_options(self.config))
 
     def remove_presence(self):
-        self.presence.clear()
-
-        if self.last_player is None:
-            backoff = self.config.preferences['rpc']['timeout_backoff']
-            min_timeout = self.config.preferences['rpc']['min_timeout']
-
-            current_timeout = min_timeout + self.timeout_backoff
-            if current_timeout >= self.config.preferences['rpc']['max_timeout']:
-                return
+        self.presence_pipeline.clear()
 
-            self.timeout_backoff += backoff
-            current_timeout = min_timeout + self.timeout_backoff
-
-            self.log(logging.INFO, f'Backing off timeout by {backoff}. Now set to {current_timeout}')
-        else:
+        if self.last_player is not None:
             self.log(logging.INFO, f'Stopped playing: {self.last_player.game_name}')
 
 
-class WiimmfiOverviewThread(Thread):
-    friendly_progress = ''
-    permanent = True
-    name = 'WiimmfiCheckThread'
-
-    update_signal = Qc.pyqtSignal(WiimmfiPlayer)
-    clear_signal = Qc.pyqtSignal()
-
-    def __init__(self, wiimmfi_thread, update_callback, clear_callback):
-        super().__init__()
-
-        self.wiimmfi_thread = wiimmfi_thread
-        self.update_callback = update_callback
-        self.clear_callback = clear_callback
-
-        self.update_signal.connect(self.update_callback)
-        self.clear_signal.connect(self.clear_callback)
-
-    def execute(self):
-        while True:
-            player = self.wiimmfi_thread.last_player
-            if player is not None:
-                self.update_signal.emit(player)
-            else:
-                self.clear_signal.emit()
-
-            time.sleep(1)
-
-
 class WiimmfiGameListThread(Thread):
     friendly_progress = ''
     permanent = True
     name = 'WiimmfiGameListThread'
 
+    def __init__(self, config, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.parser = get_parser(config.preferences['rpc'].get('html_parser', 'auto'))
+
     def execute(self):
         try:
             with (cache_path / 'wiimmfi_games.json').open('r') as file:
@@ -417,29 +801,25 @@ class WiimmfiGameListThread(Thread):
         except (json.JSONDecodeError, FileNotFoundError):
             self.update_file()
 
+    @staticmethod
+    def games_from_rows(rows):
+        """
+        Builds the entries of our games list from the rows of the game table.
+        :param rows: list of Row, without the header rows
+        :return: list of dict
+        """
+        return [{'id': row.cells[0], 'name': row.cells[1]} for row in rows]
+
     def update_file(self):
-        headers = {
-            'User-Agent': 'wiimmfi-rpc by DismissedGuy#2118 - github.com/DismissedGuy/wiimmfi-rpc'
-        }
-        resp = requests.get(wiimmfi_game_list_url, headers=headers)
+        resp = http_session.get(wiimmfi_game_list_url)
         if resp.status_code != 200:
             return
 
-        soup = BeautifulSoup(resp.text, 'html.parser')
-
-        table = soup.find(id='game')
-        if table is None:
+        rows = self.parser.table_rows(resp.text, 'game')
+        if rows is None:
             return
 
-        games_list = []
-
-        games = table.find_all('tr')[2:]
-        for game in games:
-            fields = game.find_all('td')
-            games_list.append({
-                'id': fields[0].text,
-                'name': fields[1].text.strip()
-            })
+        games_list = self.games_from_rows(rows[2:])
 
         now = datetime.utcnow()
         data = {